@@ -1,93 +1,468 @@
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
+import uuid
+import numpy as np
 import pandas as pd
+from ledger import StockLedger, new_record_id
+from progress import ProgressTracker
+from catalog import Catalog
+from shelves import ShelfProgress
+from summary import SummaryEngine, SummaryView
+from report import DISCREPANCY_SECTION, STATUS_SECTION, report_sections
+from auth import LoginIndex, hash_password, verify_password, needs_rehash, DEFAULT_ITERATIONS
+from instrumentation import Metrics
+from sheets_client import SheetsClient
+
+# ⏱️ Per-rerun timing breakdown, shown in the sidebar
+startup_timings = {}
+
+def timed(phase, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        startup_timings[phase] = time.perf_counter() - start
 
 # --- NEW: Get Google Sheet name from Streamlit secrets ---
 # This allows for separate deployments with unique sheet names.
 # Default to "InventoryStockApp" if not set.
 google_sheet_name = st.secrets.get("GOOGLE_SHEET_NAME", "InventoryStockApp")
 
-# 🗂️ Google Sheets Auth
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = Credentials.from_service_account_info(st.secrets["GOOGLE_CREDS"], scopes=scope)
-client = gspread.authorize(creds)
+# 📈 Process-wide instrumentation, off unless INSTRUMENTATION_ENABLED is set
+@st.cache_resource
+def get_metrics():
+    metrics = Metrics(enabled=bool(st.secrets.get("INSTRUMENTATION_ENABLED", False)))
+    log_path = st.secrets.get("METRICS_LOG_PATH")
+    if log_path:
+        import logging
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.getLogger("inventory_audit.metrics").addHandler(handler)
+        logging.getLogger("inventory_audit.metrics").setLevel(logging.INFO)
+    return metrics
+
+metrics = get_metrics()
+metrics.set_user(st.session_state.get("username"))
+
+# 🚦 Every Sheets call goes through one rate-limited client per process
+@st.cache_resource
+def get_sheets_client():
+    return SheetsClient(
+        rate_per_minute=int(st.secrets.get("SHEETS_QUOTA_PER_MINUTE", 60)),
+        burst=int(st.secrets.get("SHEETS_BURST", 10)),
+        metrics=metrics,
+    )
+
+# 📋 Expected StockCountDetails headers
+expected_headers = ["ShelfLabel", "WID", "Vertical", "CountedQty", "AvailableQty", "Status", "Timestamp", "CasperID", "RecordID", "Version"]
+# Each StockCountDetails row carries a stable RecordID and a Version bumped on
+# every update, so queued updates can find their row and detect overlapping edits.
+record_id_col = expected_headers.index("RecordID") + 1
+
+# 🗂️ Google Sheets connection, set up once per process instead of on every rerun.
+# gspread and google-auth are only imported here, the first time they are needed.
+@st.cache_resource
+def get_sheets():
+    timings = {}
+    start = time.perf_counter()
+    import gspread
+    from google.oauth2.service_account import Credentials
+    timings["Import gspread/google-auth"] = time.perf_counter() - start
+
+    # 🗂️ Google Sheets Auth
+    start = time.perf_counter()
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = Credentials.from_service_account_info(st.secrets["GOOGLE_CREDS"], scopes=scope)
+    client = get_sheets_client().wrap(gspread.authorize(creds))
+    timings["Authorize client"] = time.perf_counter() - start
+
+    # 🔗 Sheet References
+    start = time.perf_counter()
+    sheet = client.open(google_sheet_name)
+    timings["Open spreadsheet"] = time.perf_counter() - start
+    start = time.perf_counter()
+    worksheets = {title: sheet.worksheet(title) for title in ("Raw", "StockCountDetails", "LoginDetails")}
+    timings["Resolve worksheets"] = time.perf_counter() - start
+
+    # 📋 Ensure Updated Headers (once per process)
+    start = time.perf_counter()
+    stock_sheet = worksheets["StockCountDetails"]
+    if stock_sheet.row_values(1) != expected_headers:
+        stock_sheet.update([expected_headers], "A1:J1")
+    timings["Header check"] = time.perf_counter() - start
+    start = time.perf_counter()
+    from locator import backfill_record_ids
+    backfill_record_ids(stock_sheet, record_id_col)
+    timings["Record ID backfill"] = time.perf_counter() - start
+
+    return {"sheet": sheet, **worksheets, "timings": timings}
 
-# 🔗 Sheet References
 try:
-    sheet = client.open(google_sheet_name)
-    raw_sheet = sheet.worksheet("Raw")
-    stock_sheet = sheet.worksheet("StockCountDetails")
-    login_sheet = sheet.worksheet("LoginDetails")
-except gspread.exceptions.SpreadsheetNotFound:
+    sheets = timed("Sheets connection", get_sheets)
+except Exception as e:
+    import gspread
+    if not isinstance(e, gspread.exceptions.SpreadsheetNotFound):
+        raise
     st.error(f"Error: The Google Sheet '{google_sheet_name}' was not found. Please check the name and ensure the service account has access.")
     st.stop()
 
-
-# 📋 Ensure Updated Headers
-expected_headers = ["ShelfLabel", "WID", "Vertical", "CountedQty", "AvailableQty", "Status", "Timestamp", "CasperID"]
-if stock_sheet.row_values(1) != expected_headers:
-    stock_sheet.update("A1:H1", [expected_headers])
+sheet = sheets["sheet"]
+raw_sheet = sheets["Raw"]
+stock_sheet = sheets["StockCountDetails"]
+login_sheet = sheets["LoginDetails"]
 
 # 🧠 Session Defaults
 st.session_state.setdefault("logged_in", False)
 st.session_state.setdefault("shelf_label", "")
 st.session_state.setdefault("validated_wids", [])
+st.session_state.setdefault("shelf_progress", None)
 st.session_state.setdefault("username", "")
 st.session_state.setdefault("show_registration", False)
 st.session_state.setdefault("scanned_misplaced_wid", "")
 st.session_state.setdefault("misplaced_wid_to_count", "")
-st.session_state.setdefault("raw_data_df", None)
+st.session_state.setdefault("session_id", uuid.uuid4().hex)
 st.session_state.setdefault("stock_data_df", None)
-st.session_state.setdefault("login_data_df", None)
+st.session_state.setdefault("stock_ledger", None)
+st.session_state.setdefault("progress", None)
+st.session_state.setdefault("summary_engine", None)
+st.session_state.setdefault("shelf_reruns", 0)
+st.session_state.setdefault("shelf_batches", [])  # WriteBatch of each bulk save on the active shelf
+st.session_state.setdefault("conflicts_seen", 0)
+st.session_state.setdefault("record_versions", {})  # RecordID -> Version the write queue wrote for this session
+st.session_state.setdefault("archive_rotations", 0)
+
+# 🔁 Background refresh: each shared dataset is reloaded on its own schedule by
+# a daemon thread and swapped in atomically, so no click ever waits on an
+# expired cache. Only the first load in a process is synchronous.
+# The Raw catalog is large and identical for everyone, so it is built once per
+# load as a compact shared store instead of being copied into each session.
+# With CATALOG_PATH set it is read from a local Arrow/Parquet file written by
+# import_catalog.py instead of the Raw sheet.
+catalog_path = st.secrets.get("CATALOG_PATH")
+
+def load_catalog():
+    with metrics.timer("fetch", "get_raw_data"):
+        if catalog_path:
+            return Catalog.from_file(catalog_path)
+        return Catalog.from_records(raw_sheet.get_all_records())
+
+# StockCountDetails is mostly append-only during a count, so its process-wide
+# copy only fetches new or changed rows on each refresh.
+@st.cache_resource
+def get_stock_sync():
+    from stock_sync import StockSync
+    return StockSync(stock_sheet, expected_headers)
+
+def load_stock_data():
+    with metrics.timer("fetch", "get_stock_data"):
+        return get_stock_sync().refresh()
+
+# 🔑 Username index shared by all sessions, so login and registration checks are dict lookups.
+def load_login_index():
+    with metrics.timer("fetch", "get_login_data"):
+        return LoginIndex(pd.DataFrame(login_sheet.get_all_records()))
+
+@st.cache_resource
+def get_datasets():
+    from refresher import Dataset
+    return {
+        "catalog": Dataset("Catalog", load_catalog, interval=600),
+        "stock": Dataset("Stock counts", load_stock_data, interval=30),
+        "logins": Dataset("Logins", load_login_index, interval=600),
+    }
 
-# --- REVISED: Caching functions with optimal TTL values ---
-# This provides the auto-refresh functionality
-@st.cache_data(ttl=600)  # Refresh every 10 minutes
-def get_raw_data():
-    return pd.DataFrame(raw_sheet.get_all_records())
+datasets = get_datasets()
+
+def get_catalog():
+    return datasets["catalog"].get()
 
-@st.cache_data(ttl=30)  # Refresh every 30 seconds
 def get_stock_data():
-    return pd.DataFrame(stock_sheet.get_all_records())
-
-@st.cache_data(ttl=600)  # Refresh every 10 minutes
-def get_login_data():
-    return pd.DataFrame(login_sheet.get_all_records())
-
-# Load data into session state at the beginning
-if st.session_state.raw_data_df is None:
-    st.session_state.raw_data_df = get_raw_data()
-if st.session_state.stock_data_df is None:
-    st.session_state.stock_data_df = get_stock_data()
-if st.session_state.login_data_df is None:
-    st.session_state.login_data_df = get_login_data()
-
-# --- NEW: Function to clear all relevant caches and session state dataframes ---
-# This is called by the manual refresh button
-def clear_all_caches_and_dataframes():
-    st.cache_data.clear()
-    st.session_state.raw_data_df = None
+    # A shallow copy is enough: with copy-on-write (pandas 3, see requirements.txt), session edits never reach the shared snapshot.
+    return datasets["stock"].get().copy(deep=False)
+
+def get_login_index():
+    return datasets["logins"].get()
+
+@st.cache_resource
+def get_active_sessions():
+    return {}
+
+password_hash_iterations = int(st.secrets.get("PASSWORD_HASH_ITERATIONS", DEFAULT_ITERATIONS))
+
+# 📝 Write-behind queue shared by every session in this process.
+# Saves are journaled to local disk, confirmed right away and sent to the sheet
+# in batches. Writes still in the journal after a restart are replayed.
+@st.cache_resource
+def get_write_queue():
+    from write_queue import WriteBehindQueue
+    from journal import WriteJournal
+    from locator import RowLocator
+    return WriteBehindQueue(
+        stock_sheet,
+        flush_interval=float(st.secrets.get("WRITE_FLUSH_SECONDS", 5)),
+        max_pending=int(st.secrets.get("WRITE_FLUSH_BATCH", 25)),
+        journal=WriteJournal(st.secrets.get("WRITE_JOURNAL_PATH", "write_journal.sqlite3")),
+        locator=RowLocator(stock_sheet, record_id_col),
+    )
+
+# Created on the first run of any page, login included, so writes left in the
+# journal by a restart are replayed without waiting for someone to log in.
+write_queue = timed("Write queue", get_write_queue)
+
+# 🗄️ Archival: with ARCHIVE_DIR set, count days older than the last
+# ARCHIVE_KEEP_DAYS days are moved off StockCountDetails into local Parquet
+# partitions (by date and user), so the sheet only holds the active cycle.
+archive_dir = st.secrets.get("ARCHIVE_DIR")
+
+@st.cache_resource
+def get_archiver():
+    if not archive_dir:
+        return None
+    from archive import StockArchive, StockArchiver
+    return StockArchiver(
+        stock_sheet,
+        StockArchive(archive_dir),
+        record_id_col,
+        keep_days=int(st.secrets.get("ARCHIVE_KEEP_DAYS", 1)),
+        before=write_queue.flush,
+        after=lambda: datasets["stock"].refresh(wait=True),
+    )
+
+@st.cache_resource(max_entries=32)
+def get_archive_summary(version, users, start, end):
+    """Rollups over the archived partitions matching a query; `version` changes on every archive write."""
+    return SummaryEngine(get_archiver().archive.read(users and set(users), start, end))
+
+def get_summary_view(users=None, start=None, end=None):
+    """Summary over this session's hot rows plus the archived partitions that match the query."""
+    archiver = get_archiver()
+    if archiver is None:
+        return SummaryView([(st.session_state.summary_engine, None)])
+    archive = archiver.archive
+    archived = get_archive_summary(archive.version, tuple(sorted(users)) if users else None, start, end)
+    return SummaryView([(archived, None), (st.session_state.summary_engine, archive.closed_before)])
+
+def load_session_data(catalog):
+    """Load or refresh this session's stock frame and the indexes kept over it."""
+    archiver = get_archiver()
+    if archiver is not None and archiver.rotations != st.session_state.archive_rotations:
+        # Rows were moved to the archive; reload so this session stops carrying them.
+        st.session_state.archive_rotations = archiver.rotations
+        st.session_state.stock_data_df = None
+    if st.session_state.stock_data_df is None:
+        st.session_state.stock_data_df = get_stock_data()
+        st.session_state.stock_ledger = None
+    if st.session_state.stock_ledger is None or st.session_state.stock_ledger.df is not st.session_state.stock_data_df:
+        # Keys are normalized once here; saves then look rows up in O(1).
+        st.session_state.stock_ledger = StockLedger(st.session_state.stock_data_df)
+    elif st.session_state.progress is not None and not st.session_state.progress.is_current(
+        catalog.shelves.expected_wids, st.session_state.stock_data_df
+    ):
+        # The tracker is rebuilt from the frame below, so it must hold every saved row.
+        st.session_state.stock_ledger.fold()
+        sync_session_frame()
+    # Rebuilt only when the cached frames are reloaded; saves update it incrementally.
+    if st.session_state.progress is None or not st.session_state.progress.is_current(
+        catalog.shelves.expected_wids, st.session_state.stock_data_df
+    ):
+        st.session_state.progress = ProgressTracker(catalog.shelves.expected_wids, st.session_state.stock_data_df)
+    if st.session_state.summary_engine is None or not st.session_state.summary_engine.is_current(st.session_state.stock_data_df):
+        st.session_state.summary_engine = SummaryEngine(st.session_state.stock_data_df)
+
+# Supervisors can view summaries across users and date ranges
+supervisors = {str(u).strip().lower() for u in st.secrets.get("SUPERVISORS", [])}
+
+# Called by the per-dataset buttons under "Refresh Data"
+def refresh_dataset(key):
+    """Reload one shared dataset; the others and every other session's frames are left alone."""
+    if key != "stock":
+        datasets[key].refresh()
+        st.sidebar.success(f"🔄 Reloading {datasets[key].name} in the background.")
+        return
+    # Send pending writes first so the reload includes them, then rebuild this session's frames.
+    # A frame rebuilt without unsynced saves would lose them from the ledger and summary.
+    try:
+        write_queue.flush()
+    except Exception:
+        st.sidebar.error(f"⚠️ Sheet sync failed, keeping the current data until it succeeds: {write_queue.last_error}")
+        return
+    try:
+        datasets["stock"].refresh(wait=True)
+    except Exception:
+        st.sidebar.error(f"⚠️ Refresh failed, still showing the previous data: {datasets['stock'].last_error}")
+        return
     st.session_state.stock_data_df = None
-    st.session_state.login_data_df = None
-    st.success("✅ Cache cleared. Data will be re-fetched on next interaction.")
+    st.session_state.stock_ledger = None
     st.rerun()
 
 # REVISED Helper Functions to use session state data frames
 def validate_login(username, password):
-    df = st.session_state.login_data_df
-    if df.empty:
+    login_index = get_login_index()
+    record = login_index.get(username)
+    if record is None:
         return "deleted"
-    username = username.strip().lower()
     password = password.strip()
-    match = df[df["Username"].str.strip().str.lower() == username]
-    if match.empty:
-        return "deleted"
-    elif password == str(match.iloc[0]["Password"]).strip():
-        return "valid"
-    else:
+    if not verify_password(password, record["Password"]):
         return "invalid"
+    # Upgrade plaintext or outdated-cost hashes on a successful login.
+    if needs_rehash(record["Password"], password_hash_iterations):
+        # Only if the indexed row still holds this user; otherwise reload the index and upgrade next time.
+        cells = login_sheet.row_values(record["row"])
+        if len(cells) >= login_index.username_col and cells[login_index.username_col - 1].strip().lower() == username.strip().lower():
+            new_hash = hash_password(password, password_hash_iterations)
+            login_sheet.update_cell(record["row"], login_index.password_col, new_hash)
+            login_index.set_password(username, new_hash)
+        else:
+            datasets["logins"].refresh()
+    return "valid"
+
+def current_record(row_index_df):
+    """(RecordID, Version) of a frame row, with the Version this session's last synced update actually wrote.
+
+    After an overlapping edit the sheet holds a higher Version than the one
+    saved into the frame; expecting that one avoids reporting the next
+    update as another conflict.
+    """
+    record_id, version = st.session_state.stock_ledger.record(row_index_df)
+    return record_id, max(version, st.session_state.record_versions.get(record_id, 0))
+
+def upsert_stock_row(row_index_df, values):
+    """Write a count into the session frame and keep the ledger, progress and summary in step."""
+    return upsert_stock_rows([(row_index_df, values)])[0]
+
+def upsert_stock_rows(items):
+    """`upsert_stock_row` for many (index, values) pairs. Returns the frame indexes written."""
+    ledger = st.session_state.stock_ledger
+    indexes = ledger.upsert_many(items)
+    sync_session_frame()
+    for row_index_df in indexes:
+        row = ledger.row(row_index_df)
+        st.session_state.progress.record(row["ShelfLabel"], row["WID"])
+        st.session_state.summary_engine.record(row_index_df, row)
+    return indexes
+
+def sync_session_frame():
+    """Adopt the ledger's frame after it folded buffered rows into a new one; the trackers already hold them."""
+    ledger = st.session_state.stock_ledger
+    if ledger.df is not st.session_state.stock_data_df:
+        st.session_state.stock_data_df = ledger.df
+        st.session_state.progress.follow(ledger.df)
+        st.session_state.summary_engine.follow(ledger.df)
+
+def mark_validated(wids):
+    """Add WIDs to this session's validated list and drop them from the active shelf's remaining WIDs."""
+    st.session_state.validated_wids.extend(wids)
+    if st.session_state.shelf_progress is not None:
+        st.session_state.shelf_progress.validate(wids)
+
+def reset_validated():
+    st.session_state.validated_wids = []
+    st.session_state.shelf_progress = None
+
+def get_shelf_progress(catalog):
+    """Remaining WIDs on the active shelf, rebuilt only when the shelf or catalog changes."""
+    label = st.session_state.shelf_label
+    progress = st.session_state.shelf_progress
+    if progress is None or not progress.is_current(catalog.shelves, label):
+        progress = ShelfProgress(catalog.shelves, label, st.session_state.validated_wids)
+        st.session_state.shelf_progress = progress
+        catalog.shelves.prefetch(label)
+    return progress
+
+def expected_wid_count(wid, vertical, counted, available, status, timestamp):
+    """Frame values and queued write for a count of an expected WID on the active shelf.
+
+    Returns (frame index or None for a new row, frame values, `update_row`
+    kwargs or None, new sheet row or None).
+    """
+    ledger = st.session_state.stock_ledger
+    row_index_df = ledger.find(st.session_state.shelf_label, wid)
+
+    if row_index_df is not None:
+        record_id, version = current_record(row_index_df)
+        values = {
+            "Vertical": vertical,
+            "CountedQty": counted,
+            "Status": status,
+            "Timestamp": timestamp,
+            "CasperID": st.session_state.username,
+            "Version": version + 1,
+        }
+        update = {
+            "row": ledger.sheet_row(row_index_df),
+            "values": {3: vertical, 4: counted, 6: status, 7: timestamp, 8: st.session_state.username},
+            "record": record_id,
+            "version": version,
+            "versions": st.session_state.record_versions,
+        }
+        return row_index_df, values, update, None
+
+    new_row = [
+        st.session_state.shelf_label,
+        wid,
+        vertical,
+        counted,
+        available,
+        status,
+        timestamp,
+        st.session_state.username,
+        new_record_id(),
+        1,
+    ]
+    return None, dict(zip(expected_headers, new_row)), None, new_row
+
+def save_expected_wid_count(wid, vertical, counted, available, status, timestamp):
+    """Record a count for an expected WID on the active shelf. Returns True if an existing entry was updated."""
+    row_index_df, values, update, new_row = expected_wid_count(wid, vertical, counted, available, status, timestamp)
+    upsert_stock_row(row_index_df, values)
+
+    # Queue the write back to Google Sheet
+    if update is not None:
+        write_queue.update_row(**update)
+    else:
+        write_queue.append_row(new_row)
+    return update is not None
+
+def save_shelf_counts(shelf_df, counted):
+    """Commit counts for a whole shelf in one batched write.
+
+    `counted` is aligned with `shelf_df`; rows left blank are skipped.
+    """
+    entered = shelf_df.assign(CountedQty=pd.to_numeric(counted, errors="coerce")).dropna(subset=["CountedQty"])
+    entered = entered[entered["CountedQty"] >= 0]
+    # A WID listed twice on a shelf is one count line; the last entry wins.
+    entered = entered.drop_duplicates(subset="WID", keep="last")
+    if entered.empty:
+        st.warning("Please enter at least one counted quantity.")
+        return
+
+    available = entered["Quantity"].astype(int).to_numpy()
+    counts = entered["CountedQty"].astype(int).to_numpy()
+    statuses = np.select([counts < available, counts > available], ["Short", "Excess"], default="OK")
+    verticals = entered["Vertical"].astype(str) if "Vertical" in entered.columns else [""] * len(entered)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    items, updates, appends = [], [], []
+    for wid, vertical, count, avail, status in zip(entered["WID"].astype(str), verticals, counts, available, statuses):
+        row_index_df, values, update, new_row = expected_wid_count(wid, vertical, int(count), int(avail), str(status), timestamp)
+        items.append((row_index_df, values))
+        if update is not None:
+            updates.append(update)
+        else:
+            appends.append(new_row)
+    upsert_stock_rows(items)
+
+    # Queued as one group, so the shelf goes out in one flush whatever else is pending.
+    # The journal already holds it; the background flusher is woken rather than
+    # sending it here, so the save never waits on Sheets.
+    st.session_state.shelf_batches.append(write_queue.queue_batch(updates, appends))
+    st.success(f"✅ Saved {len(entered)} WID count(s) for shelf `{st.session_state.shelf_label}`.")
+
+    mark_validated(entered["WID"].astype(str).tolist())
+    st.rerun()
 
 def clear_misplaced_input():
     st.session_state.scanned_misplaced_wid = ""
@@ -106,27 +481,26 @@ def save_misplaced_wid_count(counted_qty):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     shelf_label = st.session_state.shelf_label
 
-    # REVISED: Use session state dataframe for checking
-    stock_df = st.session_state.stock_data_df
-    
-    existing_entry = stock_df[
-        (stock_df["ShelfLabel"].astype(str).str.strip() == str(shelf_label).strip()) &
-        (stock_df["WID"].astype(str).str.strip() == str(wid).strip()) &
-        (stock_df["Status"] == "MISPLACED")
-    ]
-
-    if not existing_entry.empty:
-        # NEW: update the session state dataframe first
-        row_index_df = existing_entry.index[0]
-        st.session_state.stock_data_df.loc[row_index_df, "CountedQty"] = counted_qty
-        st.session_state.stock_data_df.loc[row_index_df, "Timestamp"] = timestamp
-        st.session_state.stock_data_df.loc[row_index_df, "CasperID"] = st.session_state.username
-
-        # NEW: Write back to Google Sheet
-        row_index_sheet = row_index_df + 2
-        stock_sheet.update_cell(row_index_sheet, 4, counted_qty)
-        stock_sheet.update_cell(row_index_sheet, 7, timestamp)
-        stock_sheet.update_cell(row_index_sheet, 8, st.session_state.username)
+    ledger = st.session_state.stock_ledger
+    row_index_df = ledger.find(shelf_label, wid, status="MISPLACED")
+
+    if row_index_df is not None:
+        record_id, version = current_record(row_index_df)
+        upsert_stock_row(row_index_df, {
+            "CountedQty": counted_qty,
+            "Timestamp": timestamp,
+            "CasperID": st.session_state.username,
+            "Version": version + 1,
+        })
+
+        # Queue the write back to Google Sheet
+        write_queue.update_row(
+            ledger.sheet_row(row_index_df),
+            {4: counted_qty, 7: timestamp, 8: st.session_state.username},
+            record=record_id,
+            version=version,
+            versions=st.session_state.record_versions,
+        )
         st.success(f"✅ WID `{wid}` already marked as MISPLACED. Count updated to {counted_qty}.")
     else:
         new_row = [
@@ -137,78 +511,70 @@ def save_misplaced_wid_count(counted_qty):
             "",
             "MISPLACED",
             timestamp,
-            st.session_state.username
+            st.session_state.username,
+            new_record_id(),
+            1,
         ]
-        # NEW: update session state dataframe first
-        st.session_state.stock_data_df.loc[len(st.session_state.stock_data_df)] = new_row
-        
-        # NEW: Write back to Google Sheet
-        stock_sheet.append_row(new_row)
+        upsert_stock_row(None, dict(zip(expected_headers, new_row)))
+
+        # Queue the write back to Google Sheet
+        write_queue.append_row(new_row)
         st.success(f"✅ WID `{wid}` marked as MISPLACED on shelf `{shelf_label}` with count {counted_qty}.")
     
     st.session_state.misplaced_wid_to_count = ""
-    st.session_state.validated_wids.append(wid)
+    mark_validated([wid])
     st.rerun()
 
-def save_summary_report():
-    """Generates and saves a detailed summary report to a new worksheet."""
+# 📤 Summary report: one SummaryReport worksheet per process, written in
+# bounded chunks; re-saves only send the sections that changed.
+@st.cache_resource
+def get_report_writer():
+    import gspread
+    from report import SheetReportWriter
     try:
         report_sheet = sheet.worksheet("SummaryReport")
     except gspread.WorksheetNotFound:
         report_sheet = sheet.add_worksheet(title="SummaryReport", rows=1000, cols=10)
-    
-    report_sheet.clear()
+    return SheetReportWriter(report_sheet, chunk_rows=int(st.secrets.get("REPORT_CHUNK_ROWS", 500)))
 
-    # REVISED: Use session state dataframe
-    stock_df = st.session_state.stock_data_df
-    if stock_df.empty:
+def save_summary_report():
+    """Generates and saves a detailed summary report to the SummaryReport worksheet."""
+    users = {st.session_state.username}
+    engine = get_summary_view(users)
+    if not engine.has_counts():
         st.warning("No data to save.")
         return
 
-    user_stock_df = stock_df[stock_df["CasperID"] == st.session_state.username].copy()
-    if user_stock_df.empty:
+    if not engine.has_counts(users):
         st.warning("No data to save for your user account.")
         return
 
-    user_stock_df["Date"] = pd.to_datetime(user_stock_df["Timestamp"]).dt.date.astype(str)
-
-    # Updated to count the number of rows instead of summing the quantities
-    ok_count = len(user_stock_df[user_stock_df['Status'] == 'OK'])
-    misplaced_count = len(user_stock_df[user_stock_df['Status'] == 'MISPLACED'])
-    short_count = len(user_stock_df[user_stock_df['Status'] == 'Short'])
-    excess_count = len(user_stock_df[user_stock_df['Status'] == 'Excess'])
-
-    summary_data = {
-        'Status': ['OK', 'Misplaced', 'Short', 'Excess'],
-        'Line Item Count': [ok_count, misplaced_count, short_count, excess_count]
-    }
-    summary_df = pd.DataFrame(summary_data)
-
-    summary_report_data = [["Daily Status Summary"]]
-    summary_report_data.extend([summary_df.columns.tolist()])
-    summary_report_data.extend(summary_df.values.tolist())
-    report_sheet.append_rows(summary_report_data)
-
-    discrepancy_table = user_stock_df[user_stock_df["Status"] != "OK"]
-    if not discrepancy_table.empty:
-        discrepancy_table = discrepancy_table[[
-            "ShelfLabel",
-            "WID",
-            "AvailableQty",
-            "CountedQty",
-            "CasperID",
-            "Date"
-        ]].rename(columns={"AvailableQty": "Available Qty", "CountedQty": "Counted Qty", "CasperID": "Username"})
-        
-        discrepancy_data = [[]]
-        discrepancy_data.extend([["Detailed Discrepancies"]])
-        discrepancy_data.extend([discrepancy_table.columns.tolist()])
-        discrepancy_data.extend(discrepancy_table.values.tolist())
-        report_sheet.append_rows(discrepancy_data)
-
-    st.success("✅ Summary report successfully saved to the 'SummaryReport' worksheet!")
+    sections = [(title, df) for title, df in report_sections(engine, users) if title == STATUS_SECTION or not df.empty]
+    written, skipped = get_report_writer().write(tuple(sorted(users)), sections)
+    detail = f" ({written} rows written, {skipped} unchanged section(s) skipped)" if skipped else ""
+    st.success(f"✅ Summary report successfully saved to the 'SummaryReport' worksheet!{detail}")
+
+def report_downloads(sections, name):
+    """CSV / Parquet / XLSX downloads of a report, built only when clicked."""
+    from report import to_csv, to_parquet, to_xlsx, xlsx_engine
+    formats = [
+        ("CSV", "csv", "text/csv", to_csv),
+        ("Parquet", "parquet", "application/vnd.apache.parquet", to_parquet),
+    ]
+    if xlsx_engine():
+        formats.append(("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", to_xlsx))
+    for col, (label, ext, mime, export) in zip(st.columns(len(formats)), formats):
+        with col:
+            st.download_button(
+                f"⬇️ {label}",
+                data=lambda export=export: export(sections),
+                file_name=f"{name}.{ext}",
+                mime=mime,
+                key=f"report_{ext}",
+            )
 
 # 🔐 LOGIN PAGE
+current_page = "Login"
 if not st.session_state.logged_in:
     st.title("🔐 Login Page")
     tabs = st.tabs(["Login", "Register"])
@@ -232,20 +598,22 @@ if not st.session_state.logged_in:
             new_username = st.text_input("New Username", key="reg_user")
             new_password = st.text_input("New Password", type="password", key="reg_pass")
             if st.button("Register"):
-                df = st.session_state.login_data_df
-                if "Username" in df.columns and new_username.strip().lower() in df["Username"].astype(str).str.strip().str.lower().values:
+                login_index = get_login_index()
+                if new_username.strip() in login_index:
                     st.warning("⚠️ Username already exists. Try a different one.")
                 else:
                     now = datetime.now()
                     new_row = [
                         now.strftime("%Y-%m-%d"),
                         new_username.strip(),
-                        new_password.strip(),
+                        hash_password(new_password.strip(), password_hash_iterations),
                         now.strftime("%H:%M:%S")
                     ]
-                    # NEW: update session state dataframe and write to sheet
-                    st.session_state.login_data_df.loc[len(st.session_state.login_data_df)] = new_row
+                    # Write to sheet, then update the shared index, so a failed append leaves no login behind
                     login_sheet.append_row(new_row)
+                    login_index.add(new_username, new_row[2])
+                    # A reload already in flight may predate the new row.
+                    datasets["logins"].refresh()
                     st.success("✅ Registered successfully! Please login.")
                     st.session_state.show_registration = False
                     st.rerun()
@@ -254,54 +622,108 @@ if not st.session_state.logged_in:
 
 # 📦 MAIN APP
 else:
+    # Catalog and stock data are only loaded once a user is logged in, so the
+    # login page paints without them.
+    catalog = timed("Catalog", get_catalog)
+    active_sessions = get_active_sessions()
+    active_sessions[st.session_state.session_id] = time.time()
+    timed("Session data", load_session_data, catalog)
+
     st.sidebar.success(f"👋 Logged in as `{st.session_state.username}`")
     page = st.sidebar.radio("Navigation", ["Stock Count", "Summary"])
-
-    # --- NEW: Refresh button to clear cache ---
-    if st.sidebar.button("🔄 Refresh Data"):
-        clear_all_caches_and_dataframes()
+    current_page = page
+
+    # 📝 Sheet sync status for queued writes
+    pending_writes = write_queue.pending_count()
+    if write_queue.last_error:
+        st.sidebar.error(f"⚠️ Sheet sync failed, will retry: {write_queue.last_error}")
+    if pending_writes:
+        st.sidebar.info(f"⏳ {pending_writes} save(s) saved locally, waiting to sync")
+    elif write_queue.last_flush:
+        st.sidebar.caption(f"☁️ All saves synced at {write_queue.last_flush.strftime('%H:%M:%S')}")
+    if pending_writes and st.sidebar.button("⬆️ Sync Now"):
+        try:
+            synced = write_queue.flush()
+            st.sidebar.success(f"✅ Synced {synced} save(s).")
+        except Exception:
+            st.sidebar.error(f"⚠️ Sheet sync failed, will retry: {write_queue.last_error}")
+
+    # 🔀 Updates that overlapped another auditor's edit. The shared stock copy
+    # re-reads just the rows that changed instead of every cache being cleared.
+    if write_queue.conflict_count > st.session_state.conflicts_seen:
+        st.session_state.conflicts_seen = write_queue.conflict_count
+        datasets["stock"].refresh()
+    if write_queue.conflicts:
+        with st.sidebar.expander(f"🔀 {write_queue.conflict_count} overlapping edit(s)"):
+            st.caption("Saved over a newer edit of the same row, or dropped if the row was removed from the sheet.")
+            st.dataframe(pd.DataFrame(list(write_queue.conflicts)[::-1]), hide_index=True)
+
+    # 🚫 Saves the sheet rejected; set aside so they don't hold up everyone else's
+    if write_queue.failed:
+        with st.sidebar.expander(f"🚫 {len(write_queue.failed)} save(s) rejected by the sheet"):
+            st.caption("Kept in the local journal; they are not sent again until retried.")
+            st.dataframe(pd.DataFrame(list(write_queue.failed)[::-1]), hide_index=True)
+            if st.button("🔁 Retry Rejected Saves"):
+                st.success(f"✅ Queued {write_queue.retry_failed()} save(s) again.")
+
+    # 🔄 Per-dataset refresh; everything else keeps serving its current snapshot
+    with st.sidebar.expander("🔄 Refresh Data"):
+        for key, dataset in datasets.items():
+            age = dataset.age()
+            status = "refreshing…" if dataset.refreshing else f"loaded {age:.0f}s ago" if age is not None else "not loaded yet"
+            st.caption(f"**{dataset.name}**: {status} (auto-refresh every {dataset.interval}s)")
+            if dataset.last_error:
+                st.caption(f"⚠️ Last refresh failed, showing previous data: {dataset.last_error}")
+            if st.button(f"Refresh {dataset.name}", key=f"refresh_{key}"):
+                refresh_dataset(key)
 
     if st.sidebar.button("🚪 Logout"):
         st.session_state.logged_in = False
         st.session_state.username = ""
         st.session_state.shelf_label = ""
-        st.session_state.validated_wids = []
+        reset_validated()
         st.session_state.misplaced_wid_to_count = ""
         st.rerun()
 
+    # 🧮 Catalog memory: per-session copies vs. the shared compact store
+    with st.sidebar.expander("🧮 Catalog Memory"):
+        recent_sessions = sum(1 for seen in active_sessions.values() if time.time() - seen < 1800)
+        st.caption(f"{len(catalog.df):,} catalog rows from {catalog.source}, {recent_sessions} active session(s)")
+        st.dataframe(catalog.memory_report(recent_sessions), hide_index=True)
+
     if page == "Stock Count":
         st.title("📦 Inventory Stock Count App")
         if not st.session_state.shelf_label:
             shelf_input = st.text_input("Scan or Enter Shelf Label")
             if shelf_input:
                 st.session_state.shelf_label = shelf_input
+                st.session_state.shelf_reruns = 0
+                st.session_state.shelf_batches = []
                 st.success(f"Shelf Label set: {shelf_input}")
                 st.rerun()
         else:
+            st.session_state.shelf_reruns += 1
             st.info(f"📌 Active Shelf Label: `{st.session_state.shelf_label}`")
             if st.button("🔁 Change Shelf Label"):
                 st.session_state.shelf_label = ""
-                st.session_state.validated_wids = []
+                st.session_state.shelf_reruns = 0
+                st.session_state.shelf_batches = []
+                reset_validated()
                 st.session_state.misplaced_wid_to_count = ""
                 st.rerun()
             
-            # REVISED: Use session state data frames
-            raw_df = st.session_state.raw_data_df
-            stock_df = st.session_state.stock_data_df
-            shelf_df = raw_df[raw_df["ShelfLabel"] == st.session_state.shelf_label]
+            # Shelf rows come from the catalog's shelf index and the remaining
+            # WIDs are kept up to date as they are saved, so a render costs
+            # time in proportion to the shelf rather than the catalog.
+            shelf_progress = get_shelf_progress(catalog)
+            shelf_df = shelf_progress.df
 
-            remaining_wids = len(shelf_df[~shelf_df["WID"].isin(st.session_state.validated_wids)]["WID"])
+            remaining_wids = len(shelf_progress)
 
-            # --- Global Metrics Calculations ---
-            total_unique_shelflabels = raw_df["ShelfLabel"].nunique()
-            
-            raw_wids_per_shelf = raw_df.groupby('ShelfLabel')['WID'].nunique()
-            audited_wids_per_shelf = stock_df.groupby('ShelfLabel')['WID'].nunique() if not stock_df.empty else pd.Series(dtype=float)
-            
-            all_shelves_df = pd.merge(raw_wids_per_shelf, audited_wids_per_shelf, on='ShelfLabel', how='left', suffixes=('_raw', '_audited'))
-            all_shelves_df['WID_audited'] = all_shelves_df['WID_audited'].fillna(0)
-            
-            remaining_locations_global = len(all_shelves_df[all_shelves_df['WID_audited'] < all_shelves_df['WID_raw']])
+            # --- Global Metrics (maintained incrementally by ProgressTracker) ---
+            progress = st.session_state.progress
+            total_unique_shelflabels = progress.total_locations
+            remaining_locations_global = progress.remaining_locations
 
             # --- Displaying only the requested metrics ---
             col1, col2, col3 = st.columns(3)
@@ -335,15 +757,43 @@ else:
             
             if shelf_df.empty:
                 st.warning("⚠️ No data found for this Shelf Label.")
+            elif st.toggle("⚡ Bulk Count Mode", key="bulk_mode", help="Enter counts for the whole shelf and save them in one go."):
+                st.subheader("Count Expected WIDs (Bulk)")
+                st.info("Enter counted quantities for the WIDs on this shelf, then save the shelf. Blank rows are skipped.")
+                bulk_df = shelf_progress.rows()
+                if bulk_df.empty:
+                    st.success("🎉 All WIDs under this Shelf Label have been validated.")
+                else:
+                    # A form keeps grid edits from rerunning the script until the shelf is saved.
+                    with st.form("bulk_count_form"):
+                        grid = st.data_editor(
+                            pd.DataFrame({
+                                "WID": bulk_df["WID"].astype(str).to_numpy(),
+                                "Brand": bulk_df["Brand"].astype(str).to_numpy(),
+                                "Available Qty": bulk_df["Quantity"].to_numpy(),
+                                "Counted Qty": pd.array([None] * len(bulk_df), dtype="Int64"),
+                            }),
+                            column_config={"Counted Qty": st.column_config.NumberColumn(min_value=0, step=1)},
+                            disabled=["WID", "Brand", "Available Qty"],
+                            hide_index=True,
+                            use_container_width=True,
+                            key=f"bulk_grid_{st.session_state.shelf_label}",
+                        )
+                        if st.form_submit_button("✅ Save Shelf Counts"):
+                            save_shelf_counts(bulk_df, grid["Counted Qty"].to_numpy())
+                st.caption(
+                    f"🧾 This shelf so far: {st.session_state.shelf_reruns} rerun(s), "
+                    f"{sum(batch.api_calls for batch in st.session_state.shelf_batches)} Sheets call(s) from bulk saves"
+                )
             else:
                 st.subheader("Count Expected WIDs")
                 st.info("Select a WID from the list to count items expected on this shelf.")
-                remaining_wids_list = shelf_df[~shelf_df["WID"].isin(st.session_state.validated_wids)]["WID"].tolist()
+                remaining_wids_list = shelf_progress.wids()
                 
                 if remaining_wids_list:
                     selected_wid = st.selectbox("🔽 Select WID to Validate", options=remaining_wids_list, key="wid_selector")
                     if selected_wid:
-                        row = shelf_df[shelf_df["WID"] == selected_wid].iloc[0]
+                        row = shelf_progress.row(selected_wid)
                         vertical = row.get("Vertical", "")
                         st.markdown(f"""
                         ### 🔍 WID Details
@@ -368,64 +818,20 @@ else:
                                 else:
                                     color = "green"
                                 
-                                # REVISED: Use session state dataframe for logic
-                                stock_df = st.session_state.stock_data_df
-                                
-                                if "ShelfLabel" in stock_df.columns and "WID" in stock_df.columns:
-                                    existing = stock_df[
-                                        (stock_df["ShelfLabel"].astype(str).str.strip() == str(st.session_state.shelf_label).strip()) &
-                                        (stock_df["WID"].astype(str).str.strip() == str(selected_wid).strip())
-                                    ]
-                                else:
-                                    st.error("🛑 'ShelfLabel' or 'WID' column not found in stock_df. Please check your data source.")
-                                    existing = pd.DataFrame()
-                                
-                                if not existing.empty:
-                                    row_index_df = existing.index[0]
-                                    
-                                    # NEW: update session state dataframe
-                                    st.session_state.stock_data_df.loc[row_index_df, "Vertical"] = vertical
-                                    st.session_state.stock_data_df.loc[row_index_df, "CountedQty"] = counted
-                                    st.session_state.stock_data_df.loc[row_index_df, "Status"] = status
-                                    st.session_state.stock_data_df.loc[row_index_df, "Timestamp"] = timestamp
-                                    st.session_state.stock_data_df.loc[row_index_df, "CasperID"] = st.session_state.username
-
-                                    # NEW: Write back to Google Sheet
-                                    row_index_sheet = row_index_df + 2
-                                    stock_sheet.update_cell(row_index_sheet, 3, vertical)
-                                    stock_sheet.update_cell(row_index_sheet, 4, counted)
-                                    stock_sheet.update_cell(row_index_sheet, 6, status)
-                                    stock_sheet.update_cell(row_index_sheet, 7, timestamp)
-                                    stock_sheet.update_cell(row_index_sheet, 8, st.session_state.username)
-
+                                if save_expected_wid_count(selected_wid, vertical, counted, available, status, timestamp):
                                     st.success("✅ Updated existing entry.")
                                 else:
-                                    new_row = [
-                                        st.session_state.shelf_label,
-                                        selected_wid,
-                                        vertical,
-                                        counted,
-                                        available,
-                                        status,
-                                        timestamp,
-                                        st.session_state.username
-                                    ]
-                                    # NEW: update session state dataframe
-                                    st.session_state.stock_data_df.loc[len(st.session_state.stock_data_df)] = new_row
-                                    
-                                    # NEW: Write back to Google Sheet
-                                    stock_sheet.append_row(new_row)
                                     st.success("✅ New WID entry saved.")
                                 
                                 st.markdown(f'<p style="font-size:24px; color:{color};">Status: {status}</p>', unsafe_allow_html=True)
-                                st.session_state.validated_wids.append(selected_wid)
+                                mark_validated([selected_wid])
                                 st.rerun()
                 else:
                     st.success("🎉 All WIDs under this Shelf Label have been validated.")
 
             st.markdown("---")
             if st.button("🔄 Reset Validated WID List"):
-                st.session_state.validated_wids = []
+                reset_validated()
                 st.rerun()
             if st.button("📤 Save Summary Report"):
                 save_summary_report()
@@ -434,50 +840,112 @@ else:
         st.title("📊 Inventory Count Summary")
         st.markdown("---")
         
-        stock_df = st.session_state.stock_data_df
+        # Supervisors can widen the view to other users and a date range
+        view_users, start_date, end_date = {st.session_state.username}, None, None
+        if st.session_state.username.strip().lower() in supervisors:
+            all_users = st.session_state.summary_engine.users()
+            if get_archiver() is not None:
+                all_users = sorted(set(all_users) | set(get_archiver().archive.users()))
+            view_users = set(st.multiselect(
+                "👥 Users",
+                options=all_users,
+                default=[u for u in all_users if u == st.session_state.username],
+            ) or all_users)
+            date_range = st.date_input("📅 Date Range", value=())
+            if len(date_range) == 2:
+                start_date, end_date = (d.strftime("%Y-%m-%d") for d in date_range)
         
-        if stock_df.empty:
+        # Archived partitions outside the chosen users and dates are never read.
+        engine = get_summary_view(view_users, start_date, end_date)
+        if not engine.has_counts():
             st.info("No stock count data available yet.")
         else:
-            user_stock_df = stock_df[stock_df["CasperID"] == st.session_state.username].copy()
-            
-            if user_stock_df.empty:
+            if not engine.has_counts(view_users):
                 st.info("You have not recorded any counts yet.")
             else:
                 st.subheader("Daily Status Summary (Line Item Count)")
-                
-                # Updated to count the number of rows instead of summing the quantities
-                ok_count = len(user_stock_df[user_stock_df['Status'] == 'OK'])
-                misplaced_count = len(user_stock_df[user_stock_df['Status'] == 'MISPLACED'])
-                short_count = len(user_stock_df[user_stock_df['Status'] == 'Short'])
-                excess_count = len(user_stock_df[user_stock_df['Status'] == 'Excess'])
-
-                summary_data = {
-                    'Status': ['OK', 'Misplaced', 'Short', 'Excess'],
-                    'Line Item Count': [ok_count, misplaced_count, short_count, excess_count]
-                }
-                summary_df = pd.DataFrame(summary_data)
+                summary_df = engine.status_counts(view_users, start_date, end_date)
                 st.dataframe(summary_df, use_container_width=True)
+
+                if len(view_users) > 1 or start_date:
+                    st.dataframe(engine.daily_counts(view_users, start_date, end_date), use_container_width=True, hide_index=True)
                 
                 st.markdown("---")
                 
                 st.subheader("Detailed Discrepancies")
-                discrepancy_table = user_stock_df[user_stock_df["Status"] != "OK"].copy()
+                discrepancy_table = engine.discrepancies(view_users, start_date, end_date)
                 
                 if discrepancy_table.empty:
                     st.info("All items you have counted are 'OK'!")
                 else:
-                    discrepancy_table["Date"] = pd.to_datetime(discrepancy_table["Timestamp"]).dt.date.astype(str)
-                    discrepancy_table = discrepancy_table[[
-                        "ShelfLabel",
-                        "WID",
-                        "AvailableQty",
-                        "CountedQty",
-                        "CasperID",
-                        "Date"
-                    ]].rename(columns={"AvailableQty": "Available Qty", "CountedQty": "Counted Qty", "CasperID": "Username"})
                     st.dataframe(discrepancy_table, use_container_width=True)
 
+                st.markdown("---")
+                st.caption("Download this view")
+                report_downloads(
+                    [(STATUS_SECTION, summary_df), (DISCREPANCY_SECTION, discrepancy_table)],
+                    f"summary_report_{datetime.now().strftime('%Y%m%d_%H%M')}",
+                )
+
         st.markdown("---")
         if st.button("📤 Save Summary Report"):
-            save_summary_report()
\ No newline at end of file
+            save_summary_report()
+
+# ⏱️ Startup timing breakdown
+startup_timings["Total script run"] = time.perf_counter() - _script_start
+with st.sidebar.expander("⏱️ Startup Timing"):
+    st.caption("Once per process (cached connection)")
+    st.dataframe(
+        pd.DataFrame({"Phase": list(sheets["timings"]), "ms": [round(v * 1000, 1) for v in sheets["timings"].values()]}),
+        hide_index=True,
+    )
+    st.caption("This rerun")
+    st.dataframe(
+        pd.DataFrame({"Phase": list(startup_timings), "ms": [round(v * 1000, 1) for v in startup_timings.values()]}),
+        hide_index=True,
+    )
+
+# 🛠️ Admin panel: hot-path timings and Sheets API quota
+metrics.record("page", current_page, startup_timings["Total script run"])
+if st.session_state.logged_in and st.session_state.username.strip().lower() in supervisors:
+    with st.sidebar.expander("🛠️ Admin: Performance"):
+        st.toggle(
+            "Instrumentation enabled",
+            value=metrics.enabled,
+            key="metrics_enabled",
+            on_change=lambda: setattr(metrics, "enabled", st.session_state.metrics_enabled),
+        )
+        quota = int(st.secrets.get("SHEETS_QUOTA_PER_MINUTE", 60))
+        calls = metrics.calls_this_minute()
+        st.metric("Sheets API calls this minute", f"{calls} / {quota}")
+        st.progress(min(calls / quota, 1.0))
+        sheets_client = get_sheets_client()
+        st.caption(
+            f"🚦 {sheets_client.retries} retries, {sheets_client.coalesced} coalesced reads, "
+            f"{sheets_client.throttled_seconds:.1f}s waited on the rate limiter"
+        )
+        if metrics.enabled:
+            st.caption("API calls per user (last 5 minutes)")
+            st.dataframe(metrics.calls_per_user(), use_container_width=True)
+            st.caption("Timings (ms) by page, cache fetch and Sheets call")
+            st.dataframe(metrics.timing_summary(), use_container_width=True, hide_index=True)
+            st.download_button(
+                "⬇️ Export Metrics (JSON Lines)",
+                metrics.export_jsonl(),
+                file_name=f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+                mime="application/x-ndjson",
+            )
+        archiver = get_archiver()
+        if archiver is not None:
+            last = archiver.last_rotation.strftime("%H:%M:%S") if archiver.last_rotation else "not yet"
+            st.caption(
+                f"🗄️ Archive: {len(archiver.archive.partitions())} partition(s) in `{archive_dir}`, "
+                f"{archiver.archived_rows} row(s) moved by this process, last check {last}"
+            )
+            if archiver.last_error:
+                st.caption(f"⚠️ Last archival failed: {archiver.last_error}")
+            if st.button("🗄️ Archive Closed Days Now"):
+                try:
+                    st.success(f"✅ Moved {archiver.rotate()} row(s) to the archive.")
+                except Exception:
+                    st.error(f"⚠️ Archival failed, rows stay on the sheet: {archiver.last_error}")
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from urllib.parse import unquote
+
+import pandas as pd
+
+from sheets_client import contiguous_runs
+from summary import to_date
+
+QTY_COLUMNS = ["CountedQty", "AvailableQty"]
+
+
+def _numericise(value):
+    text = str(value).strip()
+    return int(text) if text.lstrip("-").isdigit() else value
+
+
+class StockArchive:
+    """Closed count days of StockCountDetails, kept as local Parquet partitions.
+
+    Rows are written under `root/date=YYYY-MM-DD/user=<CasperID>/`, so reads
+    filtered by a date range or by users only open the matching partitions.
+    Archived rows never change. A record archived twice (a rotation retried
+    after it failed half-way) is read back once, at its highest Version.
+
+    `closed_before` is the first day not in the archive: hot rows dated
+    before it are archived copies waiting to be deleted from the sheet.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.version = 0  # bumped on every write, for caches keyed on archive contents
+        os.makedirs(root, exist_ok=True)
+        days = [day for day, _ in self.partitions()]
+        self.closed_before = (date.fromisoformat(max(days)) + timedelta(days=1)).isoformat() if days else None
+
+    @staticmethod
+    def _partitioning():
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        return ds.partitioning(pa.schema([("date", pa.string()), ("user", pa.string())]), flavor="hive")
+
+    def write(self, df):
+        """Append StockCountDetails rows (all values as sheet strings) to their partitions."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        df = df.astype(str).assign(date=to_date(df["Timestamp"]).to_numpy(), user=df["CasperID"].astype(str).to_numpy())
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            self.root,
+            format="parquet",
+            partitioning=self._partitioning(),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.version += 1
+
+    def partitions(self):
+        """(date, user) of every partition on disk."""
+        found = []
+        for date_dir in os.scandir(self.root):
+            if not (date_dir.is_dir() and date_dir.name.startswith("date=")):
+                continue
+            for user_dir in os.scandir(date_dir.path):
+                if user_dir.is_dir() and user_dir.name.startswith("user="):
+                    found.append((unquote(date_dir.name[5:]), unquote(user_dir.name[5:])))
+        return found
+
+    def users(self):
+        return sorted({user for _, user in self.partitions()})
+
+    def read(self, users=None, start=None, end=None):
+        """Archived rows for `users` between `start` and `end` ('YYYY-MM-DD', inclusive)."""
+        import pyarrow.dataset as ds
+
+        if not self.partitions():
+            return pd.DataFrame()
+        dataset = ds.dataset(self.root, format="parquet", partitioning=self._partitioning())
+        condition = None
+        for part in (
+            ds.field("user").isin(sorted(users)) if users is not None else None,
+            ds.field("date") >= start if start else None,
+            ds.field("date") <= end if end else None,
+        ):
+            if part is not None:
+                condition = part if condition is None else condition & part
+        # Filters on partition fields skip non-matching directories without opening their files.
+        df = dataset.to_table(filter=condition).to_pandas().drop(columns=["date", "user"])
+        if "RecordID" in df.columns and "Version" in df.columns and not df.empty:
+            latest = pd.to_numeric(df["Version"], errors="coerce").fillna(0)
+            keep = latest.groupby(df["RecordID"].where(df["RecordID"] != "", df.index.astype(str))).idxmax()
+            df = df.loc[sorted(keep)]
+        if "Timestamp" in df.columns:
+            df = df.sort_values("Timestamp", kind="stable")
+        df = df.reset_index(drop=True).astype(object)
+        for col in QTY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].map(_numericise)
+        return df
+
+
+def rotate_closed_days(worksheet, archive, record_id_col, keep_days=1, today=None):
+    """Move rows of count days before the last `keep_days` days from the sheet into `archive`.
+
+    Rows are archived first and only then deleted from the sheet, bottom-up
+    in contiguous runs. If rows above them moved in between, nothing is
+    deleted; the next run archives them again and reads dedupe them.
+    Returns the number of rows moved.
+    """
+    values = worksheet.get_all_values()
+    if len(values) < 2 or "Timestamp" not in values[0]:
+        return 0
+    header = values[0]
+    rows = [list(row) + [""] * (len(header) - len(row)) for row in values[1:]]
+    cutoff = ((today or date.today()) - timedelta(days=keep_days - 1)).strftime("%Y-%m-%d")
+    dates = to_date([row[header.index("Timestamp")] for row in rows])
+    closed = [i for i, day in enumerate(dates) if day and day < cutoff]
+    if not closed:
+        return 0
+
+    archive.write(pd.DataFrame([rows[i] for i in closed], columns=header))
+    archive.closed_before = max(archive.closed_before or cutoff, cutoff)
+
+    ids = [row[record_id_col - 1] for row in rows]
+    current = worksheet.col_values(record_id_col)[1:len(ids) + 1]
+    if current + [""] * (len(ids) - len(current)) != ids:
+        raise RuntimeError("StockCountDetails changed during archival; closed rows will be removed on the next run")
+
+    for start, end in reversed(contiguous_runs(closed)):
+        worksheet.delete_rows(start + 2, end + 2)
+    return len(closed)
+
+
+class StockArchiver:
+    """Rotates closed count days out of StockCountDetails on a background thread.
+
+    Checks once at start-up and then every `interval` seconds. `before` runs
+    ahead of each rotation (flush pending writes) and `after` once rows were
+    moved (refresh the hot copy); `rotations` counts completed moves so
+    sessions know when to reload their frames.
+    """
+
+    def __init__(self, worksheet, archive, record_id_col, keep_days=1, interval=3600, before=None, after=None):
+        self.worksheet = worksheet
+        self.archive = archive
+        self.record_id_col = record_id_col
+        self.keep_days = keep_days
+        self.interval = interval
+        self.before = before
+        self.after = after
+
+        self._lock = threading.Lock()
+        self.last_rotation = None
+        self.last_error = None
+        self.archived_rows = 0
+        self.rotations = 0
+
+        self._thread = threading.Thread(target=self._run, name="stock-archiver", daemon=True)
+        self._thread.start()
+
+    def rotate(self):
+        """Archive closed days now. Returns the number of rows moved."""
+        with self._lock:
+            try:
+                if self.before is not None:
+                    self.before()
+                moved = rotate_closed_days(self.worksheet, self.archive, self.record_id_col, self.keep_days)
+            except Exception as e:
+                self.last_error = f"{datetime.now().strftime('%H:%M:%S')} {type(e).__name__}: {e}"
+                raise
+            self.last_rotation = datetime.now()
+            self.last_error = None
+            self.archived_rows += moved
+        if moved:
+            if self.after is not None:
+                self.after()
+            self.rotations += 1
+        return moved
+
+    def _run(self):
+        while True:
+            try:
+                self.rotate()
+            except Exception:
+                # Error is kept on `last_error`; the rows stay hot until the next run.
+                pass
+            time.sleep(self.interval)
@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import secrets
+import threading
+
+HASH_SCHEME = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = 200_000
+
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS):
+    """Salted PBKDF2-SHA256 hash stored as `pbkdf2_sha256$<iterations>$<salt>$<hex digest>`.
+
+    `iterations` is the cost knob: higher is slower to brute-force but also
+    adds that much latency to every login.
+    """
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+    return f"{HASH_SCHEME}${iterations}${salt}${digest.hex()}"
+
+
+def is_hashed(stored):
+    return str(stored).startswith(HASH_SCHEME + "$")
+
+
+def verify_password(password, stored):
+    stored = str(stored).strip()
+    if not is_hashed(stored):
+        # Accounts registered before hashing keep working until they log in once.
+        return hmac.compare_digest(password.encode(), stored.encode())
+    _, iterations, salt, expected = stored.split("$", 3)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def needs_rehash(stored, iterations):
+    stored = str(stored).strip()
+    return not is_hashed(stored) or stored.split("$", 3)[1] != str(iterations)
+
+
+class LoginIndex:
+    """Username -> login record index over the LoginDetails sheet.
+
+    Usernames are keyed stripped and lower-cased. Each record keeps the sheet
+    row it was loaded from so a password can be upgraded in place; rows can
+    shift after the load, so check the row still holds the user first.
+    """
+
+    def __init__(self, df):
+        self._lock = threading.Lock()
+        self._users = {}
+        self.username_col = list(df.columns).index("Username") + 1 if "Username" in df.columns else 2
+        self.password_col = list(df.columns).index("Password") + 1 if "Password" in df.columns else 3
+        self.next_row = len(df) + 2
+        if df.empty or "Username" not in df.columns:
+            return
+        for idx, username, password in zip(df.index, df["Username"].astype(str), df["Password"].astype(str)):
+            self._users.setdefault(username.strip().lower(), {"row": idx + 2, "Password": password.strip()})
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, username):
+        return username.strip().lower() in self._users
+
+    def get(self, username):
+        return self._users.get(username.strip().lower())
+
+    def add(self, username, password_hash):
+        """Register a user appended as the next sheet row. Returns that row."""
+        with self._lock:
+            row = self.next_row
+            self.next_row += 1
+            self._users[username.strip().lower()] = {"row": row, "Password": password_hash}
+            return row
+
+    def set_password(self, username, password_hash):
+        record = self.get(username)
+        if record is not None:
+            record["Password"] = password_hash
@@ -0,0 +1,160 @@
+"""Benchmark app.py against the in-process fake gspread backend.
+
+Drives the login, shelf-scan, misplaced-scan and summary flows through
+Streamlit's AppTest and reports p50/p99 latency, Sheets API calls per action
+and peak memory for synthetic catalogs of each size. Each size runs in its
+own process so caches and memory peaks don't leak between sizes.
+
+    python benchmark.py
+    python benchmark.py --sizes 1000 100000 --latency 0.05 --quota-per-minute 60
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def run_worker(args):
+    """Run every flow once for a single catalog size and print the raw results as JSON."""
+    from streamlit.testing.v1 import AppTest
+    from fake_gspread import FakeBackend, FakeClient, install, synthetic_spreadsheet
+
+    backend = FakeBackend(latency=args.latency, jitter=args.jitter, quota_per_minute=args.quota_per_minute, seed=1)
+    spreadsheet = synthetic_spreadsheet(args.rows, backend, hash_iterations=args.hash_iterations)
+    install(FakeClient(spreadsheet))
+
+    journal_dir = tempfile.mkdtemp(prefix="bench-journal-")
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.secrets["GOOGLE_CREDS"] = {}
+    at.secrets["WRITE_JOURNAL_PATH"] = os.path.join(journal_dir, "journal.sqlite3")
+    at.secrets["WRITE_FLUSH_SECONDS"] = 3600  # flushes happen only in the "sync" action
+    at.secrets["WRITE_FLUSH_BATCH"] = 10_000
+    at.secrets["PASSWORD_HASH_ITERATIONS"] = args.hash_iterations
+
+    samples = defaultdict(list)
+
+    def action(name, step):
+        calls = backend.total_calls
+        start = time.perf_counter()
+        step()
+        samples[name].append((time.perf_counter() - start, backend.total_calls - calls))
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+
+    def button(label):
+        return next(b for b in at.button if label in b.label)
+
+    action("first paint", at.run)
+
+    def login():
+        at.text_input(key="login_user").input("auditor1")
+        at.text_input(key="login_pass").input("password")
+        button("Login").click().run()
+    action("login", login)
+
+    shelves = sorted({row[0] for row in spreadsheet.worksheet("Raw").get_all_values()[1:]})
+    action("set shelf", lambda: at.text_input[0].input(shelves[len(shelves) // 2]).run())
+
+    def shelf_scan(i):
+        at.number_input(key="counted_qty").set_value(i % 7).run()
+        button("Save This WID").click().run()
+    for i in range(args.scans):
+        if not any("Save This WID" in b.label for b in at.button):
+            at.number_input(key="counted_qty").set_value(0).run()
+        if not any("Save This WID" in b.label for b in at.button):
+            break
+        action("shelf scan", lambda: shelf_scan(i))
+
+    def misplaced_scan(i):
+        at.text_input(key="scanned_misplaced_wid").input(f"MISPLACED-{i:05d}").run()
+        at.number_input(key="misplaced_qty_input").set_value(1 + i % 3).run()
+        button("Save Misplaced WID Count").click().run()
+    for i in range(args.scans):
+        action("misplaced scan", lambda: misplaced_scan(i))
+
+    if any("Sync Now" in b.label for b in at.sidebar.button):
+        action("sync", lambda: next(b for b in at.sidebar.button if "Sync Now" in b.label).click().run())
+
+    at.sidebar.radio[0].set_value("Summary").run()
+    for _ in range(args.scans):
+        action("summary", at.run)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "api_calls_by_method": dict(backend.calls),
+        "quota_errors": backend.quota_errors,
+        "actions": {name: {"seconds": [s for s, _ in values], "api_calls": [c for _, c in values]}
+                    for name, values in samples.items()},
+    }))
+
+
+def report(results):
+    print(f"{'rows':>10} {'action':<16} {'n':>4} {'p50 ms':>9} {'p99 ms':>9} {'API/action':>11} {'peak RSS MB':>12}")
+    for result in results:
+        for name, values in result["actions"].items():
+            seconds, calls = values["seconds"], values["api_calls"]
+            print(
+                f"{result['rows']:>10,} {name:<16} {len(seconds):>4} "
+                f"{percentile(seconds, 50) * 1000:>9.1f} {percentile(seconds, 99) * 1000:>9.1f} "
+                f"{sum(calls) / len(calls):>11.2f} {result['peak_rss_mb']:>12.1f}"
+            )
+        calls = ", ".join(f"{method}={n}" for method, n in sorted(result["api_calls_by_method"].items()))
+        print(f"{'':>10} API calls: {calls}; quota errors: {result['quota_errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="catalog sizes (Raw rows)")
+    parser.add_argument("--scans", type=int, default=20, help="repetitions per scan/summary action")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Sheets call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per Sheets call")
+    parser.add_argument("--quota-per-minute", type=int, default=0, help="raise 429 after this many calls a minute (0 = off)")
+    parser.add_argument("--hash-iterations", type=int, default=200_000, help="PBKDF2 iterations for login")
+    parser.add_argument("--timeout", type=float, default=600, help="AppTest timeout per script run")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows is not None:
+        return run_worker(args)
+
+    results = []
+    for size in args.sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--rows", str(size)] + [
+            arg for arg in sys.argv[1:] if arg != "--json"
+        ]
+        # Drop the parent's --sizes list; the worker only needs its own size.
+        if "--sizes" in cmd:
+            i = cmd.index("--sizes")
+            j = i + 1
+            while j < len(cmd) and not cmd[j].startswith("--"):
+                j += 1
+            del cmd[i:j]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(APP))
+        if proc.returncode:
+            sys.stderr.write(proc.stderr)
+            sys.exit(f"benchmark failed for {size:,} rows")
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
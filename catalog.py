@@ -0,0 +1,164 @@
+import os
+
+import pandas as pd
+
+from shelves import ShelfIndex
+
+CATALOG_COLUMNS = ["ShelfLabel", "WID", "Brand", "Vertical", "Quantity"]
+CATEGORY_COLUMNS = ["ShelfLabel", "Brand", "Vertical"]
+# Nearly unique per row, so a categorical would only add a huge categories index.
+STRING_COLUMNS = ["WID"]
+
+
+def compact_catalog(df):
+    """Return a compact copy of a Raw sheet frame.
+
+    Low-cardinality labels become stripped-string categoricals, WID becomes an
+    Arrow-backed string column and Quantity an integer column, a fraction of
+    the size of plain object columns.
+    """
+    out = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            out[col] = df[col].astype(str).str.strip().astype("category")
+        elif col in STRING_COLUMNS:
+            out[col] = df[col].astype(str).str.strip().astype(pd.StringDtype("pyarrow"))
+        elif col == "Quantity":
+            out[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int32")
+        else:
+            out[col] = df[col]
+    # Missing columns read as blank like a blank sheet cell, never NaN (which the Sheets API rejects).
+    for col in CATALOG_COLUMNS:
+        if col not in out.columns:
+            if col == "Quantity":
+                out[col] = pd.Series(0, index=out.index, dtype="int32")
+            elif col in CATEGORY_COLUMNS:
+                out[col] = pd.Series("", index=out.index, dtype="category")
+            else:
+                out[col] = pd.Series("", index=out.index, dtype=pd.StringDtype("pyarrow"))
+    return out
+
+
+class Catalog:
+    """The Raw catalog, built once per process and shared by every session.
+
+    Sessions read `df` directly and must treat it as read-only. Filtering it
+    returns new frames (pandas copy-on-write), so nothing a page does to a
+    slice can leak back into the shared catalog. Per-shelf rows come from
+    `shelves`, which is built with the catalog.
+    """
+
+    def __init__(self, df, source_bytes, source="Raw sheet"):
+        self.df = df
+        self.shelves = ShelfIndex(df)
+        self.source_bytes = source_bytes
+        self.source = source
+        self.bytes = int(self.df.memory_usage(deep=True).sum())
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from `get_all_records()` dicts of the Raw worksheet."""
+        source = pd.DataFrame(records)
+        return cls(compact_catalog(source), int(source.memory_usage(deep=True).sum()))
+
+    @classmethod
+    def from_file(cls, path):
+        """Build from a local Arrow IPC/Feather, Parquet or CSV catalog file (see import_catalog.py)."""
+        df = read_catalog_file(path)
+        return cls(df, _object_bytes(df), source=os.path.basename(path))
+
+    def memory_report(self, sessions):
+        """Catalog bytes held per session with per-session object copies vs. the shared compact store."""
+        sessions = max(sessions, 1)
+        return pd.DataFrame({
+            "Layout": ["Per-session copy (before)", "Shared compact (after)"],
+            "Bytes / session": [self.source_bytes, self.bytes // sessions],
+            f"Total for {sessions} session(s)": [self.source_bytes * sessions, self.bytes],
+        })
+
+
+# 📁 Local columnar catalog files
+def read_catalog_file(path):
+    """Read a catalog file into the compact layout.
+
+    Arrow IPC (.arrow/.feather/.ipc) files are memory-mapped and WID and
+    Quantity are used without copying; Parquet is read with memory mapping
+    and label columns decoded straight into categoricals. Both should be
+    written by import_catalog.py, which already strips and encodes labels.
+    """
+    import pyarrow as pa
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".arrow", ".feather", ".ipc"):
+        # The table's buffers point into the map, which stays open as long as they do.
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        present = set(pq.read_schema(path).names)
+        table = pq.read_table(path, memory_map=True, read_dictionary=[c for c in CATEGORY_COLUMNS if c in present])
+    elif ext == ".csv":
+        from pyarrow import csv
+        # Quantity is read as text and coerced in arrow_to_catalog, so a stray non-number reads as 0.
+        table = csv.read_csv(path, convert_options=csv.ConvertOptions(
+            column_types={c: pa.string() for c in ["Quantity", *CATEGORY_COLUMNS]},
+        ))
+    else:
+        raise ValueError(f"Unsupported catalog file type: {path}")
+    return arrow_to_catalog(table)
+
+
+def arrow_to_catalog(table):
+    """Convert an Arrow table with the catalog schema into the compact DataFrame layout."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    missing = [c for c in CATALOG_COLUMNS if c not in table.column_names]
+    if missing:
+        raise ValueError(f"Catalog file is missing columns: {', '.join(missing)}")
+    for col in CATEGORY_COLUMNS:
+        column = table[col]
+        if not pa.types.is_dictionary(column.type):
+            column = pc.utf8_trim_whitespace(column.cast(pa.string())).dictionary_encode()
+        table = table.set_column(table.schema.get_field_index(col), col, column)
+    for col in STRING_COLUMNS:
+        column = table[col]
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(pa.large_string())
+        elif not pa.types.is_large_string(column.type):
+            column = pc.utf8_trim_whitespace(column.cast(pa.large_string()))
+        table = table.set_column(table.schema.get_field_index(col), col, column)
+    quantity = table["Quantity"]
+    if pa.types.is_string(quantity.type) or pa.types.is_large_string(quantity.type):
+        # Coerced like compact_catalog: anything that is not a number reads as 0.
+        quantity = pa.array(pd.to_numeric(quantity.to_pandas(), errors="coerce").fillna(0).astype("int32"))
+    i = table.schema.get_field_index("Quantity")
+    table = table.set_column(i, "Quantity", pc.fill_null(quantity, 0).cast(pa.int32()))
+    # split_blocks avoids consolidating columns into 2D blocks, which would copy them;
+    # strings stay in their Arrow buffers.
+    return table.to_pandas(
+        split_blocks=True,
+        types_mapper=lambda t: pd.StringDtype("pyarrow") if t == pa.large_string() else None,
+    )
+
+
+def catalog_to_arrow(df):
+    """Arrow table of a compact catalog frame, label columns dictionary-encoded and WID as plain strings."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(compact_catalog(df)[CATALOG_COLUMNS], preserve_index=False)
+
+
+def _object_bytes(df):
+    """Estimated size of `df` with plain object string columns, for the memory report."""
+    total = 0
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            sizes = (series.cat.categories.astype(str).str.len().to_numpy() + 49)
+            codes = series.cat.codes.to_numpy()
+            total += int(sizes[codes[codes >= 0]].sum()) + 8 * len(series)
+        elif isinstance(series.dtype, pd.StringDtype):
+            total += int(series.str.len().sum()) + (49 + 8) * len(series)
+        else:
+            total += int(series.memory_usage(deep=True, index=False))
+    return total
@@ -0,0 +1,265 @@
+"""In-process stand-in for the gspread objects used by app.py.
+
+Used by benchmark.py to drive the app without a real spreadsheet. Every
+worksheet call goes through a shared FakeBackend, which can add latency,
+raise 429 quota errors like the Sheets API, and counts calls by method.
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+from gspread.utils import a1_to_rowcol, numericise_all
+
+
+class QuotaResponse:
+    """Minimal response object so gspread.exceptions.APIError can be raised as the real client would."""
+
+    status_code = 429
+    text = "Quota exceeded for quota metric 'Write requests' and limit 'Write requests per minute per user'"
+
+    def json(self):
+        return {"error": {"code": 429, "message": self.text, "status": "RESOURCE_EXHAUSTED"}}
+
+
+class FakeBackend:
+    """Latency, quota and call accounting shared by every fake worksheet."""
+
+    def __init__(self, latency=0.0, jitter=0.0, quota_per_minute=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.quota_per_minute = quota_per_minute
+        self.calls = Counter()
+        self.quota_errors = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    @property
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def call(self, method):
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] > 60:
+                self._window.popleft()
+            if self.quota_per_minute and len(self._window) >= self.quota_per_minute:
+                self.quota_errors += 1
+                raise gspread.exceptions.APIError(QuotaResponse())
+            self._window.append(now)
+            self.calls[method] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.latency or self.jitter else 0
+        if delay:
+            time.sleep(delay)
+
+
+class FakeWorksheet:
+    def __init__(self, title, rows, backend):
+        self.title = title
+        self.backend = backend
+        self._rows = [list(row) for row in rows]
+        self._lock = threading.Lock()
+
+    # --- Reads ---
+    def get_all_values(self, **kwargs):
+        self.backend.call("get_all_values")
+        with self._lock:
+            width = max((len(row) for row in self._rows), default=0)
+            return [[_str(v) for v in row] + [""] * (width - len(row)) for row in self._rows]
+
+    def get_all_records(self, **kwargs):
+        self.backend.call("get_all_records")
+        with self._lock:
+            if not self._rows:
+                return []
+            header = [_str(v) for v in self._rows[0]]
+            return [
+                dict(zip(header, numericise_all([_str(v) for v in row] + [""] * (len(header) - len(row)))))
+                for row in self._rows[1:]
+            ]
+
+    def row_values(self, row, **kwargs):
+        self.backend.call("row_values")
+        with self._lock:
+            values = [_str(v) for v in self._rows[row - 1]] if row <= len(self._rows) else []
+        return _rstrip(values)
+
+    def col_values(self, col, **kwargs):
+        self.backend.call("col_values")
+        with self._lock:
+            values = [_str(row[col - 1]) if len(row) >= col else "" for row in self._rows]
+        return _rstrip(values)
+
+    def get(self, range_name=None, **kwargs):
+        self.backend.call("get")
+        with self._lock:
+            return self._read_range(range_name)
+
+    def batch_get(self, ranges, **kwargs):
+        self.backend.call("batch_get")
+        with self._lock:
+            return [self._read_range(range_name) for range_name in ranges]
+
+    # --- Writes ---
+    def update(self, values=None, range_name=None, **kwargs):
+        if isinstance(range_name, (list, tuple)) and isinstance(values, str):
+            # gspread 6 still accepts the old (range_name, values) order, with a warning.
+            values, range_name = range_name, values
+        self.backend.call("update")
+        with self._lock:
+            self._write_range(range_name or "A1", values)
+
+    def update_cell(self, row, col, value):
+        self.backend.call("update_cell")
+        with self._lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data, **kwargs):
+        self.backend.call("batch_update")
+        with self._lock:
+            for item in data:
+                self._write_range(item["range"], item["values"])
+
+    def append_row(self, values, **kwargs):
+        self.backend.call("append_row")
+        with self._lock:
+            self._rows.append(list(values))
+
+    def append_rows(self, values, **kwargs):
+        self.backend.call("append_rows")
+        with self._lock:
+            self._rows.extend(list(row) for row in values)
+
+    def delete_rows(self, start_index, end_index=None):
+        self.backend.call("delete_rows")
+        with self._lock:
+            del self._rows[start_index - 1:(end_index or start_index)]
+
+    def clear(self):
+        self.backend.call("clear")
+        with self._lock:
+            self._rows = []
+
+    def batch_clear(self, ranges):
+        self.backend.call("batch_clear")
+        with self._lock:
+            for range_name in ranges:
+                start, _, end = range_name.partition(":")
+                row1, col1 = a1_to_rowcol(start)
+                row2, col2 = a1_to_rowcol(end or start)
+                for r in range(row1, min(row2, len(self._rows)) + 1):
+                    cells = self._rows[r - 1]
+                    cells[col1 - 1:col2] = [""] * len(cells[col1 - 1:col2])
+
+    def add_rows(self, rows):
+        self.backend.call("add_rows")
+        with self._lock:
+            self._rows.extend([] for _ in range(rows))
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    # --- Helpers ---
+    def _set(self, row, col, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        cells.extend([""] * (col - len(cells)))
+        cells[col - 1] = value
+
+    def _write_range(self, range_name, values):
+        row, col = a1_to_rowcol(range_name.split(":")[0])
+        for i, row_values in enumerate(values):
+            for j, value in enumerate(row_values):
+                self._set(row + i, col + j, value)
+
+    def _read_range(self, range_name):
+        start, _, end = range_name.partition(":")
+        row1, col1 = a1_to_rowcol(start)
+        if end and end[-1].isdigit():
+            row2, col2 = a1_to_rowcol(end)
+        else:
+            row2, col2 = len(self._rows), a1_to_rowcol((end or start).rstrip("0123456789") + "1")[1]
+        return _rstrip([
+            _rstrip([_str(v) for v in self._rows[r - 1][col1 - 1:col2]])
+            for r in range(row1, min(row2, len(self._rows)) + 1)
+        ])
+
+
+class FakeSpreadsheet:
+    def __init__(self, title, worksheets, backend):
+        self.title = title
+        self.backend = backend
+        self._worksheets = {name: FakeWorksheet(name, rows, backend) for name, rows in worksheets.items()}
+
+    def worksheet(self, title):
+        self.backend.call("worksheet")
+        if title not in self._worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows, cols, **kwargs):
+        self.backend.call("add_worksheet")
+        self._worksheets[title] = FakeWorksheet(title, [], self.backend)
+        return self._worksheets[title]
+
+
+class FakeClient:
+    def __init__(self, *spreadsheets):
+        self._spreadsheets = {s.title: s for s in spreadsheets}
+
+    def open(self, title, **kwargs):
+        if title not in self._spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self._spreadsheets[title]
+
+
+def install(client):
+    """Route gspread.authorize (and service-account credential loading) to `client`."""
+    from google.oauth2 import service_account
+
+    gspread.authorize = lambda *args, **kwargs: client
+    service_account.Credentials.from_service_account_info = classmethod(lambda cls, info, **kwargs: None)
+
+
+def synthetic_spreadsheet(catalog_rows, backend, title="InventoryStockApp", wids_per_shelf=40,
+                          audited_fraction=0.1, users=("auditor1",), password="password", hash_iterations=None):
+    """A spreadsheet with a Raw catalog of `catalog_rows` rows and a partly audited StockCountDetails."""
+    from auth import hash_password, DEFAULT_ITERATIONS
+
+    rng = random.Random(catalog_rows)
+    raw = [["ShelfLabel", "WID", "Brand", "Vertical", "Quantity"]]
+    for i in range(catalog_rows):
+        raw.append([f"SHELF-{i // wids_per_shelf:06d}", f"WID{i:09d}", f"Brand{i % 300}", f"Vertical{i % 25}", rng.randint(0, 20)])
+
+    stock = [["ShelfLabel", "WID", "Vertical", "CountedQty", "AvailableQty", "Status", "Timestamp", "CasperID", "RecordID", "Version"]]
+    for i in range(0, catalog_rows, max(1, round(1 / audited_fraction)) if audited_fraction else catalog_rows + 1):
+        shelf, wid, _, vertical, available = raw[i + 1]
+        counted = max(0, available + rng.choice((-1, 0, 0, 0, 1)))
+        status = "Short" if counted < available else "Excess" if counted > available else "OK"
+        day = 1 + i % 28
+        stock.append([shelf, wid, vertical, counted, available, status, f"2026-09-{day:02d} 10:00:00", users[i % len(users)],
+                      f"R{i:016x}", 1])
+
+    iterations = hash_iterations or DEFAULT_ITERATIONS
+    login = [["Date", "Username", "Password", "Time"]]
+    login.extend(["2026-09-01", user, hash_password(password, iterations), "09:00:00"] for user in users)
+
+    return FakeSpreadsheet(title, {"Raw": raw, "StockCountDetails": stock, "LoginDetails": login}, backend)
+
+
+def _str(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def _rstrip(values):
+    while values and values[-1] in ("", []):
+        values = values[:-1]
+    return values
@@ -0,0 +1,75 @@
+"""Convert the Raw worksheet into a local columnar catalog file.
+
+    python import_catalog.py catalog.arrow
+    python import_catalog.py catalog.parquet --sheet-name InventoryStockApp
+
+Reads Google credentials from .streamlit/secrets.toml (same as the app),
+downloads the Raw worksheet once and writes it with dictionary-encoded
+labels, plain-string WIDs and int32 quantities. Point the app at the result with
+CATALOG_PATH in secrets.toml. Arrow IPC (.arrow) files are memory-mapped by
+the app and load fastest; Parquet (.parquet) files are smaller on disk.
+"""
+import argparse
+import os
+import sys
+import time
+import tomllib
+
+import pandas as pd
+
+from catalog import catalog_to_arrow
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+def fetch_raw_sheet(secrets, sheet_name):
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(secrets["GOOGLE_CREDS"], scopes=SCOPE)
+    client = gspread.authorize(creds)
+    # get_all_records, like the app's Raw sheet loader, so WIDs are normalised the same way either way.
+    records = client.open(sheet_name).worksheet("Raw").get_all_records()
+    if not records:
+        sys.exit("The Raw worksheet is empty.")
+    return pd.DataFrame(records)
+
+
+def write_catalog(df, path):
+    import pyarrow as pa
+
+    table = catalog_to_arrow(df)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".arrow", ".feather", ".ipc"):
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, compression="zstd")
+    else:
+        sys.exit(f"Unsupported output type {ext!r}; use .arrow or .parquet")
+    return table.num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="output file (.arrow or .parquet)")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--sheet-name", help="spreadsheet name (default: GOOGLE_SHEET_NAME from secrets)")
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+    sheet_name = args.sheet_name or secrets.get("GOOGLE_SHEET_NAME", "InventoryStockApp")
+
+    start = time.perf_counter()
+    df = fetch_raw_sheet(secrets, sheet_name)
+    fetched = time.perf_counter() - start
+    rows = write_catalog(df, args.out)
+    print(f"Wrote {rows:,} catalog rows to {args.out} "
+          f"({os.path.getsize(args.out) / 1e6:.1f} MB; fetch {fetched:.1f}s, "
+          f"write {time.perf_counter() - start - fetched:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger("inventory_audit.metrics")
+
+_NULL = nullcontext()
+
+
+class Metrics:
+    """Hot-path timings and Sheets API call counts for this process.
+
+    Disabled by default. When disabled, `timer` hands back a shared no-op
+    context manager, so the cost is one flag check per call.
+    """
+
+    def __init__(self, enabled=False, max_events=5000, keep_minutes=5):
+        self.enabled = enabled
+        self.keep_minutes = keep_minutes
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.events = deque(maxlen=max_events)
+        self.api_calls = Counter()  # (minute, user) -> calls, last `keep_minutes` minutes
+        self._minute = None
+
+    # --- Attribution ---
+    def set_user(self, user):
+        """Attribute calls made on this thread (one script run) to `user`."""
+        self._local.user = user or "anonymous"
+
+    @property
+    def user(self):
+        return getattr(self._local, "user", "background")
+
+    # --- Recording ---
+    def timer(self, kind, name):
+        if not self.enabled:
+            return _NULL
+        return self._timer(kind, name)
+
+    @contextmanager
+    def _timer(self, kind, name):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self.record(kind, name, time.perf_counter() - start, ok)
+
+    def record(self, kind, name, seconds, ok=True):
+        if not self.enabled:
+            return
+        event = {
+            "ts": time.time(),
+            "kind": kind,
+            "name": name,
+            "ms": round(seconds * 1000, 2),
+            "user": self.user,
+            "ok": ok,
+        }
+        with self._lock:
+            self.events.append(event)
+            if kind == "sheets":
+                minute = int(event["ts"] // 60)
+                if minute != self._minute:
+                    # Once a minute, drop the minutes no view looks at any more.
+                    self._minute = minute
+                    for key in [key for key in self.api_calls if key[0] <= minute - self.keep_minutes]:
+                        del self.api_calls[key]
+                self.api_calls[(minute, event["user"])] += 1
+        logger.info(json.dumps(event))
+
+    # --- Views ---
+    def calls_this_minute(self):
+        minute = int(time.time() // 60)
+        with self._lock:
+            return sum(n for (m, _), n in self.api_calls.items() if m == minute)
+
+    def calls_per_user(self, minutes=5):
+        """API calls per user and minute over the last `minutes` minutes."""
+        since = int(time.time() // 60) - minutes + 1
+        with self._lock:
+            rows = [(m, user, n) for (m, user), n in self.api_calls.items() if m >= since]
+        df = pd.DataFrame(rows, columns=["minute", "User", "Calls"])
+        if df.empty:
+            return df
+        df["Minute"] = pd.to_datetime(df.pop("minute") * 60, unit="s").dt.strftime("%H:%M")
+        return df.pivot_table(index="User", columns="Minute", values="Calls", aggfunc="sum", fill_value=0)
+
+    def timing_summary(self):
+        with self._lock:
+            df = pd.DataFrame(list(self.events))
+        if df.empty:
+            return df
+        return (
+            df.groupby(["kind", "name"])["ms"]
+            .agg(calls="count", p50=lambda s: s.quantile(0.5), p95=lambda s: s.quantile(0.95), max="max")
+            .round(1)
+            .sort_values("p95", ascending=False)
+            .reset_index()
+        )
+
+    def export_jsonl(self):
+        with self._lock:
+            return "\n".join(json.dumps(event) for event in self.events)
+
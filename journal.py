@@ -0,0 +1,63 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class WriteJournal:
+    """Append-only SQLite journal of sheet writes that have not been confirmed yet.
+
+    Every save lands here before it is queued for the sheet, so a slow or
+    failing Sheets API never loses a count. Each entry carries an
+    idempotency key: journaling the same key twice is a no-op. Entries are
+    marked `sending` while a flush is in flight and deleted once the sheet
+    accepted them; anything still `sending` after a restart is in doubt.
+    Writes the sheet rejected are kept as `failed` until they are retried.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                row INTEGER,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                created REAL NOT NULL
+            )"""
+        )
+
+    def record(self, key, kind, payload, row=None):
+        """Journal a write. Returns its id, or None if the key was already journaled."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO writes (key, kind, row, payload, created) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, row, json.dumps(payload, default=str), time.time()),
+            )
+            return cur.lastrowid if cur.rowcount else None
+
+    def entries(self):
+        """All unconfirmed writes in journal order as (id, kind, row, payload, state)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, kind, row, payload, state FROM writes ORDER BY id").fetchall()
+        return [(id_, kind, row, json.loads(payload), state) for id_, kind, row, payload, state in rows]
+
+    def mark(self, ids, state):
+        self._execute_many("UPDATE writes SET state = ? WHERE id = ?", [(state, i) for i in ids])
+
+    def confirm(self, ids):
+        self._execute_many("DELETE FROM writes WHERE id = ?", [(i,) for i in ids])
+
+    def _execute_many(self, sql, params):
+        if not params:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(sql, params)
+            self._conn.execute("COMMIT")
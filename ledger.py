@@ -0,0 +1,117 @@
+import uuid
+
+import pandas as pd
+
+
+def new_record_id():
+    # Prefixed so the sheet and numericise never read the ID as a number.
+    return "R" + uuid.uuid4().hex[:16]
+
+
+def _norm(value):
+    return str(value).strip()
+
+
+class StockLedger:
+    """Keyed index over the StockCountDetails frame.
+
+    Maps (ShelfLabel, WID, Status) and (ShelfLabel, WID) to the frame index,
+    with keys normalized once when the ledger is built. The frame index `i`
+    lives on sheet row `i + 2` (row 1 is the header).
+
+    Adding a row to a DataFrame copies the whole frame, so new rows are held
+    in a small buffer (indexes following the frame's) and folded into `df`
+    with one concat every `fold_rows` rows. `row`, `record` and `find` see
+    buffered rows; `df` is replaced by a new frame when they are folded in.
+    """
+
+    def __init__(self, df, fold_rows=256):
+        self.df = df
+        self.fold_rows = fold_rows
+        self._added = []  # rows (column -> value) at frame indexes len(df), len(df) + 1, ...
+        self._by_status = {}
+        self._by_pair = {}
+        if df.empty or "ShelfLabel" not in df.columns or "WID" not in df.columns:
+            return
+
+        shelves = df["ShelfLabel"].astype(str).str.strip()
+        wids = df["WID"].astype(str).str.strip()
+        statuses = df["Status"].astype(str) if "Status" in df.columns else [""] * len(df)
+        for idx, shelf, wid, status in zip(df.index, shelves, wids, statuses):
+            self._by_status.setdefault((shelf, wid, status), idx)
+            self._by_pair.setdefault((shelf, wid), idx)
+
+    @staticmethod
+    def sheet_row(idx):
+        """Sheet row of frame index `idx` as of the last load; writes verify it by RecordID."""
+        return idx + 2
+
+    def row(self, idx):
+        """Row `idx` (column -> value), whether it is in `df` or still buffered."""
+        if idx >= len(self.df):
+            return self._added[idx - len(self.df)]
+        return self.df.loc[idx]
+
+    def _get(self, idx, col):
+        if idx >= len(self.df):
+            return self._added[idx - len(self.df)].get(col, "")
+        return self.df.at[idx, col]
+
+    def record(self, idx):
+        """(RecordID, Version) of a row. RecordID is None for rows saved before IDs existed."""
+        columns = self.df.columns
+        record = str(self._get(idx, "RecordID")).strip() if "RecordID" in columns else ""
+        version = str(self._get(idx, "Version")).strip() if "Version" in columns else ""
+        return record or None, int(version) if version.isdigit() else 0
+
+    def find(self, shelf, wid, status=None):
+        """Return the frame index of the first matching row, or None."""
+        if status is None:
+            return self._by_pair.get((_norm(shelf), _norm(wid)))
+        return self._by_status.get((_norm(shelf), _norm(wid), status))
+
+    def upsert(self, idx, values):
+        """Write `values` (column -> value) into the frame and keep the keys in sync.
+
+        Appends a new row when `idx` is None. Returns the frame index written.
+        """
+        return self.upsert_many([(idx, values)])[0]
+
+    def upsert_many(self, items):
+        """`upsert` each (idx, values) pair. Returns the frame indexes written, in order."""
+        written = []
+        for idx, values in items:
+            if idx is None:
+                idx = len(self.df) + len(self._added)
+                self._added.append({col: values.get(col, "") for col in self.df.columns})
+                old_status = None
+            elif idx >= len(self.df):
+                row = self._added[idx - len(self.df)]
+                old_status = str(row.get("Status", ""))
+                row.update(values)
+            else:
+                old_status = str(self.df.at[idx, "Status"])
+                for col, value in values.items():
+                    self.df.loc[idx, col] = value
+            self._index_row(idx, old_status)
+            written.append(idx)
+        if len(self._added) >= self.fold_rows:
+            self.fold()
+        return written
+
+    def fold(self):
+        """Move buffered rows into `df` with a single concat."""
+        if not self._added:
+            return
+        start = len(self.df)
+        added = pd.DataFrame(self._added, columns=self.df.columns, index=pd.RangeIndex(start, start + len(self._added)))
+        self.df = pd.concat([self.df, added]) if start else added
+        self._added = []
+
+    def _index_row(self, idx, old_status):
+        shelf, wid = _norm(self._get(idx, "ShelfLabel")), _norm(self._get(idx, "WID"))
+        status = str(self._get(idx, "Status"))
+        if old_status is not None and old_status != status and self._by_status.get((shelf, wid, old_status)) == idx:
+            del self._by_status[(shelf, wid, old_status)]
+        self._by_status.setdefault((shelf, wid, status), idx)
+        self._by_pair.setdefault((shelf, wid), idx)
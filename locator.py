@@ -0,0 +1,93 @@
+from gspread.utils import rowcol_to_a1
+
+from ledger import new_record_id
+from sheets_client import contiguous_runs
+
+
+def _version(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else 0
+
+
+class RowLocator:
+    """Finds StockCountDetails rows by RecordID and reads their current Version.
+
+    Every update carries the sheet row its session last saw the record on.
+    `resolve` checks those rows with one batch_get of their RecordID and
+    Version cells (Version is the column after RecordID). Only when a record
+    is no longer on its row are the two ID columns re-read to find it.
+    """
+
+    def __init__(self, worksheet, id_col):
+        self.worksheet = worksheet
+        self.id_col = id_col
+        self.version_col = id_col + 1
+        self.api_calls = 0
+
+    def resolve(self, updates):
+        """Locate each update's record.
+
+        `updates` are dicts with "row" and "record". Returns a list of
+        (update, row, current_version) for the records found and a list of
+        the updates whose record is no longer on the sheet.
+        """
+        if not updates:
+            return [], []
+        ranges = [f"{rowcol_to_a1(u['row'], self.id_col)}:{rowcol_to_a1(u['row'], self.version_col)}" for u in updates]
+        found, moved = [], []
+        self.api_calls += 1
+        for update, cells in zip(updates, self.worksheet.batch_get(ranges)):
+            cells = (list(cells[0]) if cells else []) + ["", ""]
+            if cells[0] == update["record"]:
+                found.append((update, update["row"], _version(cells[1])))
+            else:
+                moved.append(update)
+        if not moved:
+            return found, []
+
+        # Rows above the record were added or removed since the session read it.
+        self.api_calls += 1
+        rows = self.worksheet.get(
+            f"{rowcol_to_a1(2, self.id_col)}:{rowcol_to_a1(1, self.version_col).rstrip('0123456789')}"
+        )
+        where = {}
+        for i, cells in enumerate(rows):
+            cells = list(cells) + ["", ""]
+            if cells[0]:
+                where.setdefault(cells[0], (i + 2, _version(cells[1])))
+        missing = []
+        for update in moved:
+            if update["record"] in where:
+                row, version = where[update["record"]]
+                found.append((update, row, version))
+            else:
+                missing.append(update)
+        return found, missing
+
+
+def backfill_record_ids(worksheet, id_col):
+    """Give rows saved before record IDs existed an ID and version 1. Returns the number of rows filled."""
+    count = len(worksheet.col_values(1)) - 1  # ShelfLabel is set on every saved row
+    if count <= 0:
+        return 0
+    cell_range = f"{rowcol_to_a1(2, id_col)}:{rowcol_to_a1(count + 1, id_col + 1)}"
+    rows = list(worksheet.get(cell_range))
+    rows += [[]] * (count - len(rows))
+
+    # Only rows missing an ID or version are written, in contiguous runs, so
+    # versions bumped meanwhile by another process are left alone.
+    filled = {}
+    for i, cells in enumerate(rows):
+        record, version = (list(cells) + ["", ""])[:2]
+        if record and str(version).strip():
+            continue
+        filled[i] = [record or new_record_id(), version if str(version).strip() else 1]
+    if filled:
+        worksheet.batch_update([
+            {
+                "range": f"{rowcol_to_a1(start + 2, id_col)}:{rowcol_to_a1(end + 2, id_col + 1)}",
+                "values": [filled[i] for i in range(start, end + 1)],
+            }
+            for start, end in contiguous_runs(filled)
+        ])
+    return len(filled)
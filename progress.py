@@ -0,0 +1,49 @@
+class ProgressTracker:
+    """Global location progress, kept up to date as counts are saved.
+
+    Per-shelf expected WID counts are the catalog's (`ShelfIndex.expected_wids`,
+    shared by every session) and per-shelf audited WID sets come from
+    StockCountDetails, built once; `record` updates them so the Stock Count
+    metrics are served without a groupby.
+    """
+
+    def __init__(self, expected, stock_df):
+        self.stock_df = stock_df
+        self._expected = expected
+        self._audited = {}
+
+        if not stock_df.empty and "ShelfLabel" in stock_df.columns and "WID" in stock_df.columns:
+            shelves = stock_df["ShelfLabel"].astype(str).str.strip()
+            wids = stock_df["WID"].astype(str).str.strip()
+            for shelf, wid in zip(shelves, wids):
+                self._audited.setdefault(shelf, set()).add(wid)
+
+        self._remaining = sum(
+            1 for shelf, expected in self._expected.items()
+            if len(self._audited.get(shelf, ())) < expected
+        )
+
+    def is_current(self, expected, stock_df):
+        return self._expected is expected and self.stock_df is stock_df
+
+    def follow(self, stock_df):
+        """Track `stock_df`, a grown copy of the frame whose new rows were already `record`ed."""
+        self.stock_df = stock_df
+
+    def record(self, shelf, wid):
+        shelf, wid = str(shelf).strip(), str(wid).strip()
+        audited = self._audited.setdefault(shelf, set())
+        if wid in audited:
+            return
+        audited.add(wid)
+        expected = self._expected.get(shelf)
+        if expected is not None and len(audited) == expected:
+            self._remaining -= 1
+
+    @property
+    def total_locations(self):
+        return len(self._expected)
+
+    @property
+    def remaining_locations(self):
+        return self._remaining
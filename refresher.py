@@ -0,0 +1,88 @@
+import threading
+import time
+from datetime import datetime
+
+
+class Dataset:
+    """A sheet-backed dataset reloaded in the background on its own schedule.
+
+    `get` returns the last good snapshot without waiting; only the very first
+    call loads synchronously. Every `interval` seconds, or when `refresh` is
+    called, a daemon thread runs `loader` and swaps the result in with a
+    single assignment, so readers see the old or the new snapshot and never a
+    half-built one. A failed reload keeps the old snapshot and is retried on
+    the next tick. Loaders must build new objects rather than mutate the
+    current snapshot.
+    """
+
+    def __init__(self, name, loader, interval):
+        self.name = name
+        self.loader = loader
+        self.interval = interval
+
+        self._value = None
+        self._load_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+        self.loads = 0
+
+    def get(self):
+        value = self._value
+        if value is None:
+            # Nothing to serve yet, so this one caller waits for the load.
+            self._reload(only_if_missing=True)
+            value = self._value
+            self._start()
+        return value
+
+    def refresh(self, wait=False):
+        """Reload now: in the background, or before returning with `wait`."""
+        if wait:
+            self._reload()
+        else:
+            self._wake.set()
+
+    @property
+    def refreshing(self):
+        return self._load_lock.locked()
+
+    def age(self):
+        """Seconds since the current snapshot was loaded, or None before the first load."""
+        return None if self.loaded_at is None else (datetime.now() - self.loaded_at).total_seconds()
+
+    def _reload(self, only_if_missing=False):
+        with self._load_lock:
+            if only_if_missing and self._value is not None:
+                return
+            start = time.perf_counter()
+            try:
+                value = self.loader()
+            except Exception as e:
+                self.last_error = f"{datetime.now().strftime('%H:%M:%S')} {type(e).__name__}: {e}"
+                raise
+            self._value = value
+            self.load_seconds = time.perf_counter() - start
+            self.loaded_at = datetime.now()
+            self.last_error = None
+            self.loads += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"refresh-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self._reload()
+            except Exception:
+                # Error is kept on `last_error`; sessions keep the previous snapshot.
+                pass
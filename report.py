@@ -0,0 +1,160 @@
+import hashlib
+import io
+import json
+import threading
+from importlib.util import find_spec
+
+import pandas as pd
+
+STATUS_SECTION = "Daily Status Summary"
+DISCREPANCY_SECTION = "Detailed Discrepancies"
+
+
+def report_sections(view, users=None, start=None, end=None):
+    """[(title, frame)] of a summary report, in sheet order."""
+    return [
+        (STATUS_SECTION, view.status_counts(users, start, end)),
+        (DISCREPANCY_SECTION, view.discrepancies(users, start, end)),
+    ]
+
+
+def iter_rows(df, chunk_rows):
+    """Yield `df` as lists of plain Python rows, `chunk_rows` at a time, blanks for missing values."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        yield chunk.where(chunk.notna(), "").to_numpy().tolist()
+
+
+def _digest(df):
+    hashed = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().tobytes()
+    return hashlib.sha1(json.dumps(list(map(str, df.columns))).encode() + hashed).hexdigest()
+
+
+class SheetReportWriter:
+    """Writes report sections to a worksheet in bounded chunks.
+
+    Ranges are sent with batch_update, up to `chunk_rows` rows per call, so
+    a small report is a single call however many sections it has.
+
+    Remembers what it last wrote (per report key, e.g. the user) so a
+    re-save skips sections that did not change and, when the last section
+    only gained rows at the end, writes just the new rows. Anything else is
+    rewritten in place and left-over rows are cleared. The first save in a
+    process always rewrites the sheet, since it may have been edited since.
+    """
+
+    def __init__(self, worksheet, chunk_rows=500):
+        self.worksheet = worksheet
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._written = None  # (key, [(title, start row, rows, digest)])
+
+    def write(self, key, sections):
+        """Write `sections`. Returns (rows written, sections skipped)."""
+        with self._lock:
+            width = max(len(df.columns) for _, df in sections)
+            previous = self._written[1] if self._written and self._written[0] == key else None
+            if previous is None:
+                self.worksheet.clear()
+
+            plan, row = [], 1
+            for title, df in sections:
+                plan.append((title, row, len(df), _digest(df)))
+                row += len(df) + 3  # title, header, rows, blank
+            self._grow(row - 1)
+
+            self._pending, self._pending_rows = [], 0
+            written = skipped = 0
+            for i, ((title, df), (_, start, n, digest)) in enumerate(zip(sections, plan)):
+                old = previous[i] if previous and i < len(previous) else None
+                if old and old[:2] == (title, start) and old[2:] == (n, digest):
+                    skipped += 1
+                    continue
+                last = i == len(sections) - 1
+                if old and last and old[:2] == (title, start) and n > old[2] and _digest(df.iloc[:old[2]]) == old[3]:
+                    # Rows were only added at the end: send the new ones.
+                    written += self._write_rows(start + 2 + old[2], iter_rows(df.iloc[old[2]:], self.chunk_rows), width)
+                    continue
+                written += self._write_rows(start, [[[title], list(df.columns)]], width)
+                written += self._write_rows(start + 2, iter_rows(df, self.chunk_rows), width)
+                written += self._write_rows(start + 2 + n, [[[]]], width)
+            self._send()
+
+            old_end = previous[-1][1] + previous[-1][2] + 2 if previous else 0
+            if old_end > row - 1:
+                self.worksheet.batch_clear([f"A{row}:{_column(width)}{old_end}"])
+            self._written = (key, plan)
+            return written, skipped
+
+    def _grow(self, rows):
+        # update() cannot write past the grid, unlike append_rows().
+        if rows > self.worksheet.row_count:
+            self.worksheet.add_rows(rows - self.worksheet.row_count)
+
+    def _write_rows(self, start, chunks, width):
+        """Queue `chunks` of rows from sheet row `start`, sending first if a call would exceed `chunk_rows`."""
+        written = 0
+        for chunk in chunks:
+            rows = [list(row) + [""] * (width - len(row)) for row in chunk]
+            if self._pending_rows + len(rows) > self.chunk_rows:
+                self._send()
+            row = start + written
+            self._pending.append({"range": f"A{row}:{_column(width)}{row + len(rows) - 1}", "values": rows})
+            self._pending_rows += len(rows)
+            written += len(rows)
+        return written
+
+    def _send(self):
+        if self._pending:
+            self.worksheet.batch_update(self._pending)
+        self._pending, self._pending_rows = [], 0
+
+
+def _column(n):
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# 📁 File exports for st.download_button, built only when a button is clicked
+def to_csv(sections, chunk_rows=5000):
+    buffer = io.StringIO()
+    for i, (title, df) in enumerate(sections):
+        if i:
+            buffer.write("\n")
+        pd.DataFrame([[title]]).to_csv(buffer, header=False, index=False)
+        pd.DataFrame([list(df.columns)]).to_csv(buffer, header=False, index=False)
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(buffer, header=False, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def to_parquet(sections, chunk_rows=50_000):
+    """The last section (the discrepancy table) as Parquet row groups; the others go in the file metadata."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    *summaries, (_, table) = sections
+    metadata = {title: df.to_json(orient="records") for title, df in summaries}
+    table = table.astype(str)
+    schema = pa.Schema.from_pandas(table, preserve_index=False).with_metadata(metadata)
+    buffer = io.BytesIO()
+    with pq.ParquetWriter(buffer, schema, compression="zstd") as writer:
+        for start in range(0, max(len(table), 1), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(table.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+    return buffer.getvalue()
+
+
+def xlsx_engine():
+    """An installed Excel writer engine for pandas, or None."""
+    return next((engine for engine in ("openpyxl", "xlsxwriter") if find_spec(engine)), None)
+
+
+def to_xlsx(sections):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine=xlsx_engine()) as writer:
+        for title, df in sections:
+            df.to_excel(writer, sheet_name=title[:31], index=False)
+    return buffer.getvalue()
@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+READ_METHODS = {"get_all_records", "get_all_values", "row_values", "col_values", "get", "batch_get", "worksheet", "open"}
+# Writes that leave the sheet the same however often they are applied.
+IDEMPOTENT_METHODS = READ_METHODS | {"update", "update_cell", "batch_update", "clear", "batch_clear", "resize"}
+RETRY_CODES = {429, 500, 502, 503, 504}
+WRAPS_RESULT = {"open", "worksheet", "add_worksheet"}
+
+
+class TokenBucket:
+    """Process-wide limiter: `rate_per_minute` tokens a minute, bursts of up to `capacity`."""
+
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SheetsClient:
+    """Shared gateway for every Sheets API call made by the app.
+
+    Each call takes a token from one process-wide bucket sized to the Sheets
+    quota, is retried with jittered exponential backoff and is timed through
+    `metrics`. Reads and idempotent writes are retried on 429/5xx and
+    network errors; other writes (appends, row inserts and deletes) only on
+    429, since a 5xx or dropped connection may arrive after the sheet
+    already applied them. Identical concurrent
+    reads (same object, method and arguments) from different sessions share
+    a single in-flight request.
+    """
+
+    def __init__(self, rate_per_minute=60, burst=10, max_retries=5, base_delay=1.0, max_delay=32.0, metrics=None):
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.retries = 0
+        self.coalesced = 0
+        self.throttled_seconds = 0.0
+
+    def wrap(self, target):
+        return SheetsProxy(target, self)
+
+    def call(self, target, name, args, kwargs):
+        if name not in READ_METHODS:
+            return self._execute(target, name, args, kwargs)
+
+        key = (id(target), name, repr(args), repr(sorted(kwargs.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._execute(target, name, args, kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _execute(self, target, name, args, kwargs):
+        label = f"{getattr(target, 'title', type(target).__name__)}.{name}"
+        method = getattr(target, name)
+        for attempt in range(self.max_retries + 1):
+            self.throttled_seconds += self.bucket.acquire()
+            try:
+                if self.metrics is None:
+                    return method(*args, **kwargs)
+                with self.metrics.timer("sheets", label):
+                    return method(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not self._retryable(e, name in IDEMPOTENT_METHODS):
+                    raise
+                self.retries += 1
+                # Full jitter: spread retries from many sessions instead of having them collide again.
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    @staticmethod
+    def _retryable(error, idempotent=True):
+        if status_code(error) == 429:
+            # Rejected before it was applied: safe to send again.
+            return True
+        return idempotent and is_transient(error)
+
+
+def status_code(error):
+    """HTTP status of a gspread API error, or None."""
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+
+def is_transient(error):
+    """429, 5xx or a network error: the request may go through if sent again."""
+    return status_code(error) in RETRY_CODES or isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def contiguous_runs(indexes):
+    """[(first, last)] runs of consecutive values in ascending `indexes`, so each run is one sheet range."""
+    runs = []
+    for i in indexes:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [(first, last) for first, last in runs]
+
+
+class SheetsProxy:
+    """Routes every method call on a gspread client, spreadsheet or worksheet through a SheetsClient."""
+
+    def __init__(self, target, client):
+        self._target = target
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            result = self._client.call(self._target, name, args, kwargs)
+            return SheetsProxy(result, self._client) if name in WRAPS_RESULT else result
+        return call
@@ -0,0 +1,134 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _norm(value):
+    return str(value).strip()
+
+
+def _aisle_key(label):
+    # "A2-10" sorts before "A10-1": digit runs compare as numbers.
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", label) if part]
+
+
+class ShelfIndex:
+    """Shelf -> catalog rows index, built once per catalog load.
+
+    Catalog row positions are grouped by shelf once, so a shelf's rows are a
+    `take` of its own block rather than a scan of the whole catalog, and the
+    distinct WIDs expected on each shelf are counted in the same pass. Recently
+    used shelf frames are kept in a small LRU shared by every session, and
+    the shelves that follow in aisle order can be prefetched into it.
+    """
+
+    def __init__(self, df, cache_size=64):
+        self.df = df
+        self.cache_size = cache_size
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self.expected_wids = {}  # shelf label -> distinct catalog WIDs on it
+
+        if not df.empty and "ShelfLabel" in df.columns:
+            shelves = df["ShelfLabel"]
+            if not isinstance(shelves.dtype, pd.CategoricalDtype):
+                shelves = shelves.astype(str).str.strip().astype("category")
+            codes = shelves.cat.codes.to_numpy()
+            self._order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[self._order], np.arange(len(shelves.cat.categories) + 1))
+            used = bounds[1:] > bounds[:-1]
+            # Catalog labels are already stripped (see compact_catalog / arrow_to_catalog).
+            labels = shelves.cat.categories.astype(str)[used]
+            self._blocks = dict(zip(labels, zip(bounds[:-1][used].tolist(), bounds[1:][used].tolist())))
+            if "WID" in df.columns:
+                counts = pd.Series(df["WID"].to_numpy()).groupby(codes).nunique()
+                categories = shelves.cat.categories.astype(str)
+                self.expected_wids = {categories[code]: n for code, n in counts.items() if code >= 0}
+        self._aisle = None
+        self._aisle_pos = None
+
+    @property
+    def aisle_order(self):
+        """Shelf labels in aisle order, sorted on first use."""
+        if self._aisle is None:
+            aisle = sorted(self._blocks, key=_aisle_key)
+            self._aisle_pos = {label: i for i, label in enumerate(aisle)}
+            self._aisle = aisle
+        return self._aisle
+
+    def __contains__(self, label):
+        return _norm(label) in self._blocks
+
+    def frame(self, label):
+        """Catalog rows for `label` in catalog order (empty if the shelf is unknown)."""
+        label = _norm(label)
+        with self._lock:
+            frame = self._frames.get(label)
+            if frame is not None:
+                self._frames.move_to_end(label)
+                return frame
+        if label not in self._blocks:
+            return self.df.iloc[:0]
+        start, end = self._blocks[label]
+        frame = self.df.take(self._order[start:end])
+        with self._lock:
+            self._frames[label] = frame
+            while len(self._frames) > self.cache_size:
+                self._frames.popitem(last=False)
+        return frame
+
+    def next_shelves(self, label, n=2):
+        order = self.aisle_order
+        i = self._aisle_pos.get(_norm(label))
+        return [] if i is None else order[i + 1:i + 1 + n]
+
+    def prefetch(self, label, n=2):
+        """Warm the frames of the `n` shelves after `label` in aisle order on a background thread."""
+        def run():
+            for shelf in self.next_shelves(label, n):
+                self.frame(shelf)
+        threading.Thread(target=run, name="shelf-prefetch", daemon=True).start()
+
+
+class ShelfProgress:
+    """Expected WIDs still to be counted on one shelf, for one session.
+
+    Built from the shelf's catalog frame when the shelf is set; `validate`
+    drops WIDs as they are counted so renders never re-filter the shelf.
+    """
+
+    def __init__(self, index, label, validated=()):
+        self.index = index
+        self.label = label
+        self.df = index.frame(label)
+        self._remaining = {}   # position in self.df -> WID, in shelf order
+        self._positions = {}   # WID -> positions in self.df
+        for pos, wid in enumerate(self.df["WID"].astype(str)):
+            self._remaining[pos] = wid
+            self._positions.setdefault(wid, []).append(pos)
+        self.validate(validated)
+
+    def is_current(self, index, label):
+        return self.index is index and self.label == label
+
+    def validate(self, wids):
+        for wid in wids:
+            for pos in self._positions.pop(str(wid), ()):
+                del self._remaining[pos]
+
+    def __len__(self):
+        return len(self._remaining)
+
+    def wids(self):
+        return list(self._remaining.values())
+
+    def rows(self):
+        """Catalog rows of the WIDs still to be counted."""
+        return self.df.take(list(self._remaining))
+
+    def row(self, wid):
+        return self.df.iloc[self._positions[str(wid)][0]]
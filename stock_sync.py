@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pandas as pd
+from gspread.utils import numericise_all, rowcol_to_a1
+
+from sheets_client import contiguous_runs
+
+
+class StockSync:
+    """Incrementally synced copy of the StockCountDetails sheet.
+
+    The Timestamp column is the watermark: every save writes a fresh
+    timestamp, so comparing it against the last seen column tells us which
+    rows were appended or changed. Only those row ranges are fetched. A full
+    reload happens on first use, when the header changes, or when the sheet
+    has fewer rows than before. How often `refresh` runs is up to the caller.
+    """
+
+    def __init__(self, worksheet, expected_headers):
+        self.worksheet = worksheet
+        self.expected_headers = expected_headers
+
+        self._lock = threading.Lock()
+        self.header = None
+        self.frame = None
+        self._watermarks = []
+        self.last_sync = 0.0
+        self.full_reloads = 0
+        self.rows_fetched = 0
+
+    def refresh(self):
+        """Sync with the sheet and return a private copy of the frame."""
+        with self._lock:
+            self._sync()
+            return self.frame.copy()
+
+    # --- Sync ---
+    def _sync(self):
+        if self.frame is None:
+            return self._full_reload()
+
+        header = self.worksheet.row_values(1)
+        if header != self.header or "Timestamp" not in header:
+            return self._full_reload()
+
+        watermarks = self.worksheet.col_values(header.index("Timestamp") + 1)[1:]
+        if len(watermarks) < len(self._watermarks):
+            return self._full_reload()
+
+        changed = [i for i, (old, new) in enumerate(zip(self._watermarks, watermarks)) if old != new]
+        changed.extend(range(len(self._watermarks), len(watermarks)))
+        if len(changed) > len(watermarks) // 2:
+            return self._full_reload()
+        if changed:
+            self._fetch_rows(changed)
+        self._watermarks = watermarks
+        self.last_sync = time.time()
+
+    def _full_reload(self):
+        values = self.worksheet.get_all_values()
+        header = values[0] if values else list(self.expected_headers)
+        rows = [self._pad(row, len(header)) for row in values[1:]]
+        ts_col = header.index("Timestamp") if "Timestamp" in header else None
+
+        self.header = header
+        # Object columns, so later row writes never trip over mixed int/"" cells.
+        self.frame = pd.DataFrame([numericise_all(row) for row in rows], columns=header, dtype=object)
+        self._watermarks = [row[ts_col] for row in rows] if ts_col is not None else []
+        self.last_sync = time.time()
+        self.full_reloads += 1
+        self.rows_fetched += len(rows)
+
+    def _fetch_rows(self, indexes):
+        runs = contiguous_runs(indexes)
+        last_col = len(self.header)
+        ranges = [f"{rowcol_to_a1(start + 2, 1)}:{rowcol_to_a1(end + 2, last_col)}" for start, end in runs]
+        results = self.worksheet.batch_get(ranges)
+
+        new_rows = []
+        for (start, end), values in zip(runs, results):
+            values = list(values) + [[]] * (end - start + 1 - len(values))
+            for offset, row in enumerate(values):
+                idx = start + offset
+                row = numericise_all(self._pad(row, last_col))
+                if idx < len(self.frame):
+                    self.frame.loc[idx] = row
+                else:
+                    new_rows.append(row)
+            self.rows_fetched += end - start + 1
+
+        if new_rows:
+            start = len(self.frame)
+            appended = pd.DataFrame(new_rows, columns=self.header, index=range(start, start + len(new_rows)), dtype=object)
+            self.frame = pd.concat([self.frame, appended]) if len(self.frame) else appended
+
+    @staticmethod
+    def _pad(row, width):
+        return list(row) + [""] * (width - len(row))
@@ -0,0 +1,148 @@
+import pandas as pd
+
+STATUS_LABELS = {"OK": "OK", "MISPLACED": "Misplaced", "Short": "Short", "Excess": "Excess"}
+DISCREPANCY_COLUMNS = ["ShelfLabel", "WID", "Available Qty", "Counted Qty", "Username", "Date"]
+
+
+def to_date(timestamps):
+    """Vectorized Timestamp -> 'YYYY-MM-DD' string, '' when unparseable."""
+    parsed = pd.to_datetime(pd.Series(timestamps, dtype=object), format="mixed", errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").fillna("")
+
+
+class SummaryEngine:
+    """Per-user, per-day and per-status rollups of StockCountDetails.
+
+    Built in one pass over the frame (timestamps parsed once), then kept
+    current by `record` as counts are saved. Views filter the small rollup
+    tables by user and date instead of rescanning the ledger.
+    """
+
+    def __init__(self, stock_df):
+        self.stock_df = stock_df
+        self._counts = {}         # (user, date, status) -> rows
+        self._keys = {}           # frame index -> (user, date, status)
+        self._discrepancies = {}  # (user, date) -> {frame index: row}
+        if stock_df.empty or "Status" not in stock_df.columns:
+            return
+
+        users = stock_df["CasperID"].astype(str).to_numpy()
+        dates = to_date(stock_df["Timestamp"]).to_numpy()
+        statuses = stock_df["Status"].astype(str).to_numpy()
+        self._counts = (
+            pd.DataFrame({"user": users, "date": dates, "status": statuses})
+            .groupby(["user", "date", "status"]).size().to_dict()
+        )
+        self._keys = dict(zip(stock_df.index, zip(users, dates, statuses)))
+
+        discrepant = statuses != "OK"
+        if discrepant.any():
+            rows = stock_df.loc[discrepant, ["ShelfLabel", "WID", "AvailableQty", "CountedQty", "CasperID"]]
+            for idx, row, user, date in zip(rows.index, rows.itertuples(index=False), users[discrepant], dates[discrepant]):
+                self._discrepancies.setdefault((user, date), {})[idx] = (*row, date)
+
+    def is_current(self, stock_df):
+        return self.stock_df is stock_df
+
+    def follow(self, stock_df):
+        """Track `stock_df`, a grown copy of the frame whose new rows were already `record`ed."""
+        self.stock_df = stock_df
+
+    def record(self, idx, row):
+        """Apply a saved row (column -> value) at frame index `idx`."""
+        user = str(row["CasperID"])
+        date = to_date([row["Timestamp"]]).iloc[0]
+        status = str(row["Status"])
+
+        old = self._keys.get(idx)
+        if old is not None:
+            self._counts[old] -= 1
+            self._discrepancies.get(old[:2], {}).pop(idx, None)
+        key = (user, date, status)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._keys[idx] = key
+        if status != "OK":
+            self._discrepancies.setdefault((user, date), {})[idx] = (
+                row["ShelfLabel"], row["WID"], row["AvailableQty"], row["CountedQty"], user, date,
+            )
+
+    # --- Views ---
+    @staticmethod
+    def _matches(user, date, users, start, end):
+        return (users is None or user in users) and (start is None or date >= start) and (end is None or date <= end)
+
+    def users(self):
+        return sorted({user for user, _, _ in self._counts})
+
+    def status_counts(self, users=None, start=None, end=None):
+        totals = dict.fromkeys(STATUS_LABELS, 0)
+        for (user, date, status), n in self._counts.items():
+            if status in totals and self._matches(user, date, users, start, end):
+                totals[status] += n
+        return pd.DataFrame({
+            "Status": list(STATUS_LABELS.values()),
+            "Line Item Count": list(totals.values()),
+        })
+
+    def daily_counts(self, users=None, start=None, end=None):
+        """Line items per day and status, one row per day."""
+        rows = {}
+        for (user, date, status), n in self._counts.items():
+            if n and status in STATUS_LABELS and self._matches(user, date, users, start, end):
+                day = rows.setdefault(date, dict.fromkeys(STATUS_LABELS.values(), 0))
+                day[STATUS_LABELS[status]] += n
+        return pd.DataFrame.from_dict(rows, orient="index").sort_index().rename_axis("Date").reset_index()
+
+    def discrepancies(self, users=None, start=None, end=None):
+        matched = [
+            item
+            for (user, date), bucket in self._discrepancies.items()
+            if self._matches(user, date, users, start, end)
+            for item in bucket.items()
+        ]
+        return pd.DataFrame([row for _, row in sorted(matched)], columns=DISCREPANCY_COLUMNS)
+
+    def has_counts(self, users=None, start=None, end=None):
+        return any(n for (user, date, _), n in self._counts.items() if self._matches(user, date, users, start, end))
+
+
+class SummaryView:
+    """The SummaryEngine views combined over several engines.
+
+    Used to report over the archived partitions that matched a query and the
+    hot sheet as one summary. `parts` are (engine, since) pairs; an engine
+    only counts days from its `since` date ('YYYY-MM-DD' or None), so rows
+    already archived but still on the hot sheet are not counted twice.
+    """
+
+    def __init__(self, parts):
+        self.parts = [(engine, since) for engine, since in parts if engine is not None]
+
+    def _each(self, start, end):
+        for engine, since in self.parts:
+            yield engine, max(filter(None, (start, since)), default=None), end
+
+    def users(self):
+        return sorted({user for engine, _ in self.parts for user in engine.users()})
+
+    def status_counts(self, users=None, start=None, end=None):
+        counts = [engine.status_counts(users, s, e) for engine, s, e in self._each(start, end)]
+        total = counts[0].copy()
+        for other in counts[1:]:
+            total["Line Item Count"] += other["Line Item Count"].to_numpy()
+        return total
+
+    def daily_counts(self, users=None, start=None, end=None):
+        frames = [engine.daily_counts(users, s, e) for engine, s, e in self._each(start, end)]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames).groupby("Date", sort=True).sum().reset_index()
+
+    def discrepancies(self, users=None, start=None, end=None):
+        frames = [engine.discrepancies(users, s, e) for engine, s, e in self._each(start, end)]
+        found = [df for df in frames if not df.empty]
+        return pd.concat(found, ignore_index=True) if found else frames[0]
+
+    def has_counts(self, users=None, start=None, end=None):
+        return any(engine.has_counts(users, s, e) for engine, s, e in self._each(start, end))
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import gspread
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gspread import FakeBackend, FakeWorksheet  # noqa: E402
+
+HEADER = ["ShelfLabel", "WID", "Vertical", "CountedQty", "AvailableQty", "Status", "Timestamp", "CasperID", "RecordID", "Version"]
+RECORD_ID_COL = HEADER.index("RecordID") + 1
+
+
+class ErrorResponse:
+    """Response for gspread.exceptions.APIError with the given HTTP status."""
+
+    def __init__(self, code):
+        self.status_code = code
+        self.text = f"HTTP {code}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "ERROR"}}
+
+
+def api_error(code):
+    return gspread.exceptions.APIError(ErrorResponse(code))
+
+
+class FlakyWorksheet(FakeWorksheet):
+    """A fake worksheet whose write calls can be made to fail.
+
+    `fail_next[method]` is a list of errors raised by the next calls of that
+    method; with `apply_first` the call is applied before its error is raised,
+    as when the response to a call that went through is lost. `reject` holds
+    A1 ranges `batch_update` refuses with a 400, whatever else is in the call.
+    """
+
+    def __init__(self, rows, backend=None):
+        super().__init__("StockCountDetails", rows, backend or FakeBackend())
+        self.fail_next = {}
+        self.apply_first = False
+        self.reject = set()
+
+    @property
+    def rows(self):
+        return [list(row) for row in self._rows]
+
+    def _maybe_fail(self, method, apply):
+        errors = self.fail_next.get(method)
+        if not errors:
+            return apply()
+        if self.apply_first:
+            apply()
+        raise errors.pop(0)
+
+    def append_rows(self, values, **kwargs):
+        return self._maybe_fail("append_rows", lambda: super(FlakyWorksheet, self).append_rows(values, **kwargs))
+
+    def batch_update(self, data, **kwargs):
+        if any(item["range"] in self.reject for item in data):
+            raise api_error(400)
+        return self._maybe_fail("batch_update", lambda: super(FlakyWorksheet, self).batch_update(data, **kwargs))
+
+
+def stock_row(shelf, wid, counted, record, version, timestamp="2026-10-01 10:00:00"):
+    return [shelf, wid, "V", counted, counted, "OK", timestamp, "alice", record, version]
+
+
+@pytest.fixture
+def worksheet():
+    return FlakyWorksheet([
+        HEADER,
+        stock_row("S1", "W1", 1, "R1", 1),
+        stock_row("S1", "W2", 2, "R2", 1),
+        stock_row("S1", "W3", 3, "R3", 1),
+    ])
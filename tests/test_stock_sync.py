@@ -0,0 +1,51 @@
+from conftest import HEADER, stock_row
+from stock_sync import StockSync
+
+TIMESTAMP = HEADER.index("Timestamp") + 1
+COUNTED = HEADER.index("CountedQty") + 1
+
+
+def test_refresh_fetches_only_new_and_changed_rows(worksheet):
+    sync = StockSync(worksheet, HEADER)
+    assert len(sync.refresh()) == 3
+    assert sync.full_reloads == 1
+
+    worksheet.update_cell(3, COUNTED, 9)
+    worksheet.update_cell(3, TIMESTAMP, "2026-10-01 11:00:00")
+    worksheet.append_rows([stock_row("S2", "W4", 4, "R4", 1, "2026-10-01 11:00:01")])
+    fetched = sync.rows_fetched
+
+    frame = sync.refresh()
+    assert sync.full_reloads == 1
+    assert sync.rows_fetched - fetched == 2
+    assert worksheet.backend.calls["batch_get"] == 1
+    assert frame["CountedQty"].tolist() == [1, 9, 3, 4]
+    assert frame["WID"].tolist() == ["W1", "W2", "W3", "W4"]
+
+
+def test_refresh_without_changes_fetches_no_rows(worksheet):
+    sync = StockSync(worksheet, HEADER)
+    sync.refresh()
+    fetched = sync.rows_fetched
+
+    assert len(sync.refresh()) == 3
+    assert sync.rows_fetched == fetched
+    assert worksheet.backend.calls["batch_get"] == 0
+
+
+def test_refresh_reloads_everything_when_rows_are_removed(worksheet):
+    sync = StockSync(worksheet, HEADER)
+    sync.refresh()
+    worksheet.delete_rows(2)
+
+    frame = sync.refresh()
+    assert sync.full_reloads == 2
+    assert frame["WID"].tolist() == ["W2", "W3"]
+
+
+def test_refreshed_copy_is_private(worksheet):
+    sync = StockSync(worksheet, HEADER)
+    frame = sync.refresh()
+    frame.loc[0, "CountedQty"] = 99
+
+    assert sync.refresh()["CountedQty"].tolist() == [1, 2, 3]
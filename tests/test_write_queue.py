@@ -0,0 +1,196 @@
+import pytest
+
+from conftest import RECORD_ID_COL, api_error, stock_row
+from journal import WriteJournal
+from locator import RowLocator
+from write_queue import WriteBehindQueue
+
+COUNTED = 4
+VERSION = RECORD_ID_COL + 1
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return WriteJournal(str(tmp_path / "journal.sqlite3"))
+
+
+def make_queue(worksheet, journal=None):
+    # A long interval and a high threshold keep the background flusher out of the way.
+    return WriteBehindQueue(worksheet, flush_interval=3600, max_pending=1000, journal=journal,
+                            locator=RowLocator(worksheet, RECORD_ID_COL))
+
+
+def states(journal):
+    return [state for _, _, _, _, state in journal.entries()]
+
+
+# --- Batching ---
+def test_flush_sends_appends_and_updates_in_one_call_each(worksheet):
+    queue = make_queue(worksheet)
+    batch = queue.queue_batch(
+        updates=[
+            {"row": 2, "values": {COUNTED: 10}, "record": "R1", "version": 1},
+            {"row": 3, "values": {COUNTED: 20}, "record": "R2", "version": 1},
+        ],
+        appends=[stock_row("S2", "W4", 4, "R4", 1), stock_row("S2", "W5", 5, "R5", 1)],
+    )
+    queue.flush()
+
+    calls = worksheet.backend.calls
+    assert calls["append_rows"] == 1
+    assert calls["batch_update"] == 1
+    assert calls["batch_get"] == 1  # the locator's row check
+    assert batch.api_calls == 3
+    rows = worksheet.rows
+    assert [row[COUNTED - 1] for row in rows[1:]] == [10, 20, 3, 4, 5]
+    assert [row[VERSION - 1] for row in rows[1:3]] == [2, 2]
+    assert queue.pending_count() == 0
+
+
+def test_updates_to_one_record_are_merged_before_a_flush(worksheet):
+    queue = make_queue(worksheet)
+    versions = {}
+    queue.update_row(2, {COUNTED: 10}, record="R1", version=1, versions=versions)
+    queue.update_row(2, {COUNTED: 11}, record="R1", version=2, versions=versions)
+    assert queue.pending_count() == 1
+
+    assert queue.flush() == 1
+    assert worksheet.rows[1][COUNTED - 1] == 11
+    assert worksheet.rows[1][VERSION - 1] == 3
+    assert versions == {"R1": 3}
+    assert queue.conflict_count == 0
+
+
+# --- Failed writes ---
+def test_transient_error_requeues_the_writes(worksheet, journal):
+    queue = make_queue(worksheet, journal)
+    queue.update_row(2, {COUNTED: 10}, record="R1", version=1)
+    worksheet.fail_next["batch_update"] = [api_error(503)]
+
+    with pytest.raises(Exception):
+        queue.flush()
+    assert queue.pending_count() == 1
+    assert queue.last_error
+    assert states(journal) == ["pending"]
+
+    assert queue.flush() == 1
+    assert worksheet.rows[1][COUNTED - 1] == 10
+    assert queue.last_error is None
+    assert journal.entries() == []
+
+
+def test_rejected_write_is_set_aside_and_the_rest_sent(worksheet, journal):
+    queue = make_queue(worksheet, journal)
+    queue.update_row(2, {COUNTED: 10}, record="R1", version=1)
+    queue.update_row(3, {COUNTED: 20}, record="R2", version=1)
+    worksheet.reject.add("D3")
+
+    assert queue.flush() == 1
+    assert worksheet.rows[1][COUNTED - 1] == 10
+    assert worksheet.rows[2][COUNTED - 1] == 2
+    assert [(w["record"], w["kind"]) for w in queue.failed] == [("R2", "update")]
+    assert states(journal) == ["failed"]
+    assert queue.pending_count() == 0
+
+    worksheet.reject.clear()
+    assert queue.retry_failed() == 1
+    assert not queue.failed
+    assert queue.flush() == 1
+    assert worksheet.rows[2][COUNTED - 1] == 20
+    assert journal.entries() == []
+
+
+def test_rejected_writes_are_reloaded_as_failed_after_a_restart(worksheet, journal):
+    queue = make_queue(worksheet, journal)
+    queue.update_row(3, {COUNTED: 20}, record="R2", version=1)
+    worksheet.reject.add("D3")
+    queue.flush()
+
+    restarted = make_queue(worksheet, journal)
+    assert restarted.pending_count() == 0
+    assert [w["record"] for w in restarted.failed] == ["R2"]
+
+
+# --- In-doubt appends ---
+def test_append_whose_response_was_lost_is_not_sent_twice(worksheet, journal):
+    queue = make_queue(worksheet, journal)
+    queue.append_row(stock_row("S2", "W4", 4, "R4", 1))
+    worksheet.fail_next["append_rows"] = [api_error(500)]
+    worksheet.apply_first = True
+
+    with pytest.raises(Exception):
+        queue.flush()
+    assert states(journal) == ["sending"]  # in doubt until checked against the sheet
+
+    queue.flush()
+    assert [row[1] for row in worksheet.rows].count("W4") == 1
+    assert journal.entries() == []
+
+
+def test_in_doubt_appends_are_replayed_once_after_a_restart(worksheet, journal):
+    landed, lost = stock_row("S2", "W4", 4, "R4", 1), stock_row("S2", "W5", 5, "R5", 1)
+    for key, values in (("a", landed), ("b", lost)):
+        journal.record(key, "append", values)
+    journal.mark([id_ for id_, *_ in journal.entries()], "sending")
+    worksheet.append_rows([landed])  # reached the sheet before the process died
+
+    queue = make_queue(worksheet, journal)
+    assert queue.replayed_writes == 2
+    queue.flush()
+
+    wids = [row[1] for row in worksheet.rows]
+    assert wids.count("W4") == 1
+    assert wids.count("W5") == 1
+    assert journal.entries() == []
+
+
+# --- Relocation and conflicts ---
+def test_update_follows_its_record_to_a_new_row(worksheet):
+    queue = make_queue(worksheet)
+    queue.update_row(4, {COUNTED: 30}, record="R3", version=1)
+    worksheet.delete_rows(2)  # R1 removed, so R3 moves up to row 3
+
+    queue.flush()
+    assert worksheet.rows[2][RECORD_ID_COL - 1] == "R3"
+    assert worksheet.rows[2][COUNTED - 1] == 30
+    assert worksheet.rows[2][VERSION - 1] == 2
+    assert queue.relocated_writes == 1
+    assert queue.conflict_count == 0
+
+
+def test_update_over_a_newer_sheet_version_is_a_conflict(worksheet):
+    queue = make_queue(worksheet)
+    versions = {}
+    worksheet.update_cell(3, VERSION, 2)  # saved meanwhile by another process
+    queue.update_row(3, {COUNTED: 20}, record="R2", version=1, versions=versions)
+
+    queue.flush()
+    assert [(c["kind"], c["record"], c["expected_version"], c["sheet_version"]) for c in queue.conflicts] == [
+        ("version", "R2", 1, 2)
+    ]
+    assert worksheet.rows[2][VERSION - 1] == 3
+    assert versions == {"R2": 3}
+
+
+def test_update_to_a_removed_record_is_dropped(worksheet):
+    queue = make_queue(worksheet)
+    queue.update_row(3, {COUNTED: 20}, record="R2", version=1)
+    worksheet.delete_rows(3)
+
+    queue.flush()
+    assert [(c["kind"], c["record"]) for c in queue.conflicts] == [("missing", "R2")]
+    assert "R2" not in [row[RECORD_ID_COL - 1] for row in worksheet.rows]
+
+
+def test_edits_from_two_sessions_merged_before_a_flush_are_a_conflict(worksheet):
+    queue = make_queue(worksheet)
+    alice, bob = {}, {}
+    queue.update_row(3, {COUNTED: 20}, record="R2", version=1, versions=alice)
+    queue.update_row(3, {COUNTED: 21}, record="R2", version=1, versions=bob)
+    assert [(c["kind"], c["expected_version"], c["sheet_version"]) for c in queue.conflicts] == [("version", 1, 2)]
+
+    queue.flush()
+    assert queue.conflict_count == 1
+    assert worksheet.rows[2][COUNTED - 1] == 21
+    assert worksheet.rows[2][VERSION - 1] == 3
+    assert alice == bob == {"R2": 3}
@@ -0,0 +1,425 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from gspread.utils import rowcol_to_a1
+
+from sheets_client import is_transient, status_code
+
+
+class WriteBatch:
+    """A group of writes queued together; `api_calls` counts the calls spent sending them."""
+
+    def __init__(self):
+        self.api_calls = 0
+
+
+class WriteBehindQueue:
+    """Collects pending StockCountDetails writes and flushes them in batches.
+
+    Cell updates are merged per record so re-counting the same WID before a
+    flush only sends the latest values. Appends are flushed before updates so a
+    row that was appended and then re-counted lands on the right sheet row.
+
+    With a `locator`, updates that carry a RecordID are checked against the
+    sheet before they are sent: a record that moved is written on its new
+    row, and one whose Version changed since the session read it is written
+    over the newer version and reported in `conflicts`. Updates without a
+    RecordID (rows saved before IDs existed) are written to their row as is.
+
+    With a `journal`, every write is journaled locally before it is queued and
+    only removed from the journal once the sheet accepted it. Writes left in
+    the journal by a previous process are replayed on start-up.
+
+    Only 429, 5xx and network errors put writes back in the queue. A write
+    the sheet rejects outright (any other error) is set aside in `failed`,
+    and marked failed in the journal, so it cannot hold up later saves;
+    `retry_failed` queues those again. Appends that may have reached the
+    sheet before an error are checked against it before being re-sent.
+    """
+
+    def __init__(self, worksheet, flush_interval=5.0, max_pending=25, journal=None, locator=None):
+        self.worksheet = worksheet
+        self.journal = journal
+        self.locator = locator
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._appends = []         # [{"ids", "values", "in_doubt"}]
+        self._updates = {}         # record ID (or sheet row) -> {"ids", "row", "record", "version", "values"}
+        self._set_aside = []       # writes the sheet rejected, as queued
+
+        self.last_flush = None
+        self.last_error = None
+        self.flushed_writes = 0
+        self.api_calls = 0
+        self.replayed_writes = 0
+        self.relocated_writes = 0
+        self.conflict_count = 0
+        self.conflicts = deque(maxlen=100)
+        self.failed = deque(maxlen=100)
+
+        if journal is not None:
+            self._replay()
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # --- Enqueue ---
+    def update_row(self, row, values, record=None, version=None, versions=None):
+        """Queue cell updates for a sheet row. `values` maps column number -> value.
+
+        `record` and `version` are the row's RecordID and the Version the
+        caller last read; the Version cell is written by the flush. Once it
+        is, the Version written is stored in `versions[record]` if given, so
+        the caller's next update expects that one rather than its own guess.
+        """
+        update = self._update_write(row, values, record, version, versions)
+        with self._lock:
+            self._queue_update(update)
+        self._maybe_wake()
+
+    def append_row(self, values):
+        append = self._append_write(values)
+        if append is None:
+            return
+        with self._lock:
+            self._appends.append(append)
+        self._maybe_wake()
+
+    def queue_batch(self, updates=(), appends=()):
+        """Queue a group of writes (e.g. a whole shelf) so they are flushed together.
+
+        `updates` are `update_row` keyword dicts and `appends` row values.
+        All of them are added under one lock and the flusher is woken once,
+        so no flush can start part-way through the group. Returns a
+        WriteBatch that counts the API calls spent sending it.
+        """
+        batch = WriteBatch()
+        updates = [self._update_write(**update, batch=batch) for update in updates]
+        appends = [a for a in (self._append_write(values, batch) for values in appends) if a is not None]
+        with self._lock:
+            for update in updates:
+                self._queue_update(update)
+            self._appends.extend(appends)
+        self._wake.set()
+        return batch
+
+    def _update_write(self, row, values, record=None, version=None, versions=None, batch=None):
+        payload = {"record": record, "version": version, "values": {str(col): value for col, value in values.items()}}
+        journal_id = self._journal("update", payload, row)
+        return {
+            "ids": {journal_id} if journal_id else set(),
+            "row": row,
+            "record": record,
+            "version": version,
+            "values": dict(values),
+            "bumps": 1,  # updates merged into this one, each a Version bump
+            "heads": {version + 1} if version is not None else set(),  # Versions the merged updates left their sessions at
+            "versions": [versions] if versions is not None else [],
+            "batch": batch,
+        }
+
+    def _append_write(self, values, batch=None):
+        """A pending append, or None if the same row was already journaled."""
+        journal_id = self._journal("append", list(values))
+        if journal_id is False:
+            return None
+        return {"ids": [journal_id] if journal_id else [], "values": list(values), "in_doubt": False, "batch": batch}
+
+    def _queue_update(self, update, older=False):
+        """Merge an update into the pending ones for its record. Call with the lock held.
+
+        `older` marks an update that was queued before the pending one (a
+        failed flush putting it back): its values don't override newer ones
+        and its Version is the one the sheet should still have.
+
+        Merged updates count as one Version bump each. An update that was
+        not made on top of one already merged (its Version is not one they
+        left their session at), e.g. another session editing the same record
+        before a flush, is reported as a conflict here, since the flush will
+        only see the first one's Version.
+        """
+        key = update["record"] or ("row", update["row"])
+        pending = self._updates.get(key)
+        if pending is None:
+            self._updates[key] = update
+            return
+        first, then = (update, pending) if older else (pending, update)
+        if update["record"] and first["heads"] and then["version"] is not None and then["version"] not in first["heads"]:
+            self._conflict(then, "version", first["row"], max(first["heads"]))
+        pending["heads"] = first["heads"] | then["heads"]
+        pending["ids"] |= update["ids"]
+        pending["batch"] = pending["batch"] or update["batch"]
+        pending["versions"] += [v for v in update["versions"] if all(v is not w for w in pending["versions"])]
+        pending["bumps"] += update["bumps"]
+        if older:
+            pending["values"] = {**update["values"], **pending["values"]}
+            pending["row"], pending["version"] = update["row"], update["version"]
+        else:
+            pending["values"].update(update["values"])
+
+    def _journal(self, kind, payload, row=None):
+        """Journal a write first. Returns its id, None without a journal, or False for a duplicate."""
+        if self.journal is None:
+            return None
+        # The key is derived from the write itself, so a repeated identical save is journaled once.
+        key = hashlib.sha1(json.dumps([kind, row, payload], default=str).encode()).hexdigest()
+        journal_id = self.journal.record(key, kind, payload, row)
+        return False if journal_id is None else journal_id
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._appends) + len(self._updates)
+
+    def _maybe_wake(self):
+        if self.pending_count() >= self.max_pending:
+            self._wake.set()
+
+    # --- Flush ---
+    def flush(self):
+        """Send everything pending, normally in at most two API calls. Returns the number of writes sent.
+
+        Writes the sheet rejects are set aside rather than raised; errors
+        worth retrying put the unsent writes back in the queue and are raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                appends, self._appends = self._appends, []
+                updates, self._updates = list(self._updates.values()), {}
+            if not appends and not updates:
+                return 0
+            self._mark(appends + updates, "sending")
+
+            sent = 0
+            try:
+                if appends:
+                    appends = self._drop_already_sent(appends)
+                    sent += self._send(appends, self._append_batch)
+                if updates:
+                    data = self._update_data(updates)
+                    sent += self._send(updates, lambda batch: self._update_batch(batch, [d for u in batch for d in data[id(u)]]))
+            except Exception as e:
+                # Put unsent writes back in front of anything queued meanwhile.
+                with self._lock:
+                    self._appends = appends + self._appends
+                    for update in updates:
+                        self._queue_update(update, older=True)
+                # In-doubt appends stay `sending`, so a restart checks them against the sheet too.
+                self._mark([a for a in appends if not a["in_doubt"]] + updates, "pending")
+                self.last_error = f"{datetime.now().strftime('%H:%M:%S')} {type(e).__name__}: {e}"
+                raise
+
+            self.flushed_writes += sent
+            self.last_flush = datetime.now()
+            self.last_error = None
+            return sent
+
+    def _send(self, writes, send):
+        """Send `writes` with `send(batch)`, taking each off the list once it is sent or set aside.
+
+        When the sheet rejects the batch, its writes are sent one at a time
+        so only the ones it actually rejects are set aside.
+        """
+        if not writes:
+            return 0
+        try:
+            send(writes)
+        except Exception as e:
+            if is_transient(e):
+                raise
+            if len(writes) == 1:
+                self._set_aside_write(writes.pop(), e)
+                return 0
+            sent = 0
+            while writes:
+                try:
+                    send(writes[:1])
+                except Exception as e:
+                    if is_transient(e):
+                        raise
+                    self._set_aside_write(writes.pop(0), e)
+                    continue
+                self._confirm(writes[:1])
+                del writes[:1]
+                sent += 1
+            return sent
+        sent = len(writes)
+        self._confirm(writes)
+        writes.clear()
+        return sent
+
+    def _append_batch(self, appends):
+        self._count_calls(appends, 1)
+        try:
+            self.worksheet.append_rows([append["values"] for append in appends])
+        except Exception as e:
+            if status_code(e) != 429:
+                # The rows may have been added before the error came back.
+                for append in appends:
+                    append["in_doubt"] = True
+            raise
+
+    def _update_batch(self, updates, data):
+        if data:
+            self._count_calls(updates, 1)
+            self.worksheet.batch_update(data, value_input_option="USER_ENTERED")
+
+    def _drop_already_sent(self, appends):
+        """Confirm in-doubt appends whose row is already on the sheet; returns the rest."""
+        doubtful = [append for append in appends if append["in_doubt"]]
+        if not doubtful:
+            return appends
+        self._count_calls(doubtful, 1)
+        on_sheet = {tuple(row) for row in self.worksheet.get_all_values()}
+        remaining = []
+        for append in appends:
+            if append["in_doubt"] and tuple(str(v) for v in append["values"]) in on_sheet:
+                self._confirm([append])
+                continue
+            append["in_doubt"] = False
+            remaining.append(append)
+        return remaining
+
+    def _set_aside_write(self, write, error):
+        self._mark([write], "failed")
+        with self._lock:
+            self._set_aside.append(write)
+        self._report_failed(write, f"{type(error).__name__}: {error}")
+
+    def _report_failed(self, write, error):
+        self.failed.append({
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "kind": "append" if "in_doubt" in write else "update",
+            "record": write.get("record"),
+            "row": write.get("row"),
+            "values": json.dumps(write["values"], default=str),
+            "error": error,
+        })
+
+    def retry_failed(self):
+        """Queue the writes the sheet rejected again. Returns how many."""
+        with self._lock:
+            writes, self._set_aside = self._set_aside, []
+            for write in writes:
+                if "in_doubt" in write:
+                    self._appends.append(write)
+                else:
+                    self._queue_update(write)
+        self._mark(writes, "pending")
+        self.failed.clear()
+        self._wake.set()
+        return len(writes)
+
+    def _count_calls(self, writes, calls):
+        """Add `calls` to the total and to each WriteBatch the writes came from."""
+        self.api_calls += calls
+        for batch in {id(w["batch"]): w["batch"] for w in writes if w.get("batch") is not None}.values():
+            batch.api_calls += calls
+
+    def _mark(self, writes, state):
+        if self.journal is not None:
+            self.journal.mark([i for write in writes for i in write["ids"]], state)
+
+    def _confirm(self, writes):
+        for write in writes:
+            if "written_version" in write:
+                written = write.pop("written_version")
+                for versions in write.get("versions", ()):
+                    versions[write["record"]] = written
+        if self.journal is not None:
+            self.journal.confirm([i for write in writes for i in write["ids"]])
+
+    def _update_data(self, updates):
+        """batch_update data per update (by `id`), with guarded ones re-targeted to their record's current row.
+
+        Updates whose record is gone from the sheet get no data.
+        """
+        guarded = [u for u in updates if u["record"]] if self.locator is not None else []
+        targets = [(u, u["row"], None) for u in updates if not (u["record"] and self.locator is not None)]
+        if guarded:
+            reads = self.locator.api_calls
+            found, missing = self.locator.resolve(guarded)
+            self._count_calls(guarded, self.locator.api_calls - reads)
+            targets.extend(found)
+            for update in missing:
+                self._conflict(update, "missing", None, None)
+
+        data = {id(update): [] for update in updates}
+        for update, row, current in targets:
+            if current is not None:
+                if row != update["row"]:
+                    self.relocated_writes += 1
+                if update["version"] is not None and current != update["version"]:
+                    self._conflict(update, "version", row, current)
+            cells = data[id(update)]
+            cells.extend({"range": rowcol_to_a1(row, col), "values": [[value]]} for col, value in update["values"].items())
+            if current is not None:
+                written = current + update["bumps"]
+                cells.append({"range": rowcol_to_a1(row, self.locator.version_col), "values": [[written]]})
+                update["written_version"] = written
+        return data
+
+    def _conflict(self, update, kind, row, current):
+        # "version": another edit landed (or was queued) since the session read the record; ours was written over it.
+        # "missing": the record is gone from the sheet; the update is dropped.
+        self.conflict_count += 1
+        self.conflicts.append({
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "kind": kind,
+            "record": update["record"],
+            "row": row,
+            "expected_version": update["version"],
+            "sheet_version": current,
+        })
+
+    # --- Replay ---
+    def _replay(self):
+        """Queue writes a previous process journaled but never confirmed."""
+        for journal_id, kind, row, payload, state in self.journal.entries():
+            if kind == "append":
+                # An in-flight append may have reached the sheet before the process died;
+                # the first flush skips the ones whose row is already there.
+                write = {"ids": [journal_id], "values": payload, "in_doubt": state == "sending", "batch": None}
+            else:
+                # Journals written before record IDs hold a bare {col: value} payload.
+                update = payload if "values" in payload else {"record": None, "version": None, "values": payload}
+                write = {
+                    "ids": {journal_id},
+                    "row": row,
+                    "record": update["record"],
+                    "version": update["version"],
+                    "values": {int(col): value for col, value in update["values"].items()},
+                    "bumps": 1,
+                    "heads": {update["version"] + 1} if update["version"] is not None else set(),
+                    "versions": [],
+                    "batch": None,
+                }
+            if state == "failed":
+                self._set_aside.append(write)
+                self._report_failed(write, "rejected by the sheet before a restart")
+                continue
+            if kind == "append":
+                self._appends.append(write)
+            else:
+                self._queue_update(write)
+            self.replayed_writes += 1
+
+        if self.replayed_writes:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Error is kept on `last_error` and the writes are retried next tick.
+                time.sleep(self.flush_interval)